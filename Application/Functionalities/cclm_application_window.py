@@ -1,5 +1,10 @@
+from typing import Any, Callable, Optional
+
+from PyQt5.QtCore import QThreadPool
 from PyQt5.QtWidgets import QMainWindow
 
+from Application.Functionalities.worker import Worker
+
 
 class CCLMApplicationWindow(QMainWindow):
     """An abstract class that provides the framework for each
@@ -10,6 +15,7 @@ class CCLMApplicationWindow(QMainWindow):
         super().__init__()
 
         self.next_win = None
+        self.worker = None
 
     def populate_grid(self) -> None:
         """Adds widgets in a grid to the window"""
@@ -22,3 +28,47 @@ class CCLMApplicationWindow(QMainWindow):
         self.close()
         if self.next_win is not None:
             self.next_win.show()
+
+    def run_in_background(self, task: Callable[[Callable[[int, str], None]], Any],
+                          on_finished: Callable[[Any], None],
+                          on_stopped: Optional[Callable[[], None]] = None) -> None:
+        """Run the task on a worker thread, showing its progress in the status bar.
+        on_finished is called with the result of the task, and on_stopped if it
+        fails or is cancelled. Any task already running is cancelled.
+        """
+        self.cancel_background_work()
+        self.worker = Worker(task)
+        worker = self.worker
+
+        def finished(result: Any) -> None:
+            if self.worker is worker:
+                self.worker = None
+                self.statusBar().clearMessage()
+                on_finished(result)
+
+        def stopped(message: str = 'Cancelled') -> None:
+            if self.worker is not None and self.worker is not worker:
+                return
+            self.worker = None
+            self.statusBar().showMessage(message)
+            if on_stopped is not None:
+                on_stopped()
+
+        worker.signals.progress.connect(lambda percentage, message:
+                                        self.statusBar().showMessage(f'{message}... {percentage}%'))
+        worker.signals.finished.connect(finished)
+        worker.signals.failed.connect(lambda message: stopped('Failed: ' + message))
+        worker.signals.cancelled.connect(stopped)
+
+        QThreadPool.globalInstance().start(worker)
+
+    def cancel_background_work(self) -> None:
+        """Cancel the task running on a worker thread, if any"""
+        if self.worker is not None:
+            self.worker.cancel()
+            self.worker = None
+
+    def closeEvent(self, event) -> None:
+        """Cancel any background work when the window is closed"""
+        self.cancel_background_work()
+        super().closeEvent(event)
@@ -1,39 +1,98 @@
-import plotly.express as px
-from typing import Dict, Tuple
-from Computation.dataset_utilities import map_iso_to_country
-from Computation.computation import budget_details, set_up_computation
-import pandas
+from typing import Callable, Dict, List, Optional, Tuple, Union, TYPE_CHECKING
+from Computation.dataset_utilities import get_year_dataset
+from Computation.computation import allocation_arrays, factor_scores
+from Computation.result_cache import cached_allocation
+from Computation.instrumentation import instrumented, stage
+import base64
+import json
+import os
+import tempfile
 
+if TYPE_CHECKING:
+    import numpy
 
+# Name of the copy of plotly.js shared by the html maps of a directory, in which {version} is replaced by the
+# version of plotly.js, so that a copy written by another version of plotly is never loaded
+PLOTLY_JS_FILE = 'plotly-{version}.min.js'
+
+# Page of an html map, in which {plotly_js} and {figure} are replaced
+_HTML_PAGE = """<html>
+<head><meta charset="utf-8" /></head>
+<body style="margin: 0">
+<div id="map" style="height: 100vh; width: 100%"></div>
+{plotly_js}
+<script type="text/javascript">
+var figure = {figure};
+Plotly.newPlot("map", figure.data, figure.layout, {"responsive": true});
+</script>
+</body>
+</html>
+"""
+
+# Page of the live preview map, in which {plotly_js} is replaced. Calling showFigure with a figure draws it,
+# or updates the map already drawn in place, keeping its zoom
+_PREVIEW_PAGE = """<html>
+<head><meta charset="utf-8" /></head>
+<body style="margin: 0">
+<div id="map" style="height: 100vh; width: 100%"></div>
+{plotly_js}
+<script type="text/javascript">
+function showFigure(figure) {
+    figure.layout.uirevision = "preview";
+    Plotly.react("map", figure.data, figure.layout, {"responsive": true});
+}
+</script>
+</body>
+</html>
+"""
+
+
+@instrumented('plot')
 def _plot(total_budget: float, factor_proportionality: Dict[str, str], weights: Dict[str, float],
           year: str) -> Dict[str, Tuple[float, float]]:
     """information for the graph to be plotted."""
-    percentage_values = {}
-    data = map_iso_to_country(year)
-    for code in data:
-        percentage_values[code] = budget_details(total_budget, data[code], factor_proportionality, weights)
-    return percentage_values
+    return cached_allocation(total_budget, factor_proportionality, weights, year)
 
 
-def run(total_budget: float, factor_proportionality: Dict[str, str], weights: Dict[str, float],
-        year: str) -> None:
-    """Plots the graph with the passed parameters"""
+def build_figure(total_budget: float, factor_proportionality: Dict[str, str], weights: Dict[str, float],
+                 year: str, progress: Optional[Callable[[int, str], None]] = None):
+    """Builds the graph with the passed parameters without showing it, reporting
+    each stage to progress if it is given.
+    """
+    if progress is not None:
+        progress(0, 'Preparing datasets for ' + year)
+    get_year_dataset(year)
 
-    map_data = map_iso_to_country(year)
-    set_up_computation(year)
+    if progress is not None:
+        progress(50, 'Allocating budget')
     output = _plot(total_budget, factor_proportionality, weights, year)
+
+    # The allocation may have found the datasets changed and discarded them, so the countries are only read
+    # after it and every column follows the countries of the allocation
+    map_data = get_year_dataset(year).countries
     d = {'Iso Code': [code for code in output],
          'Budget': [output[code][0] for code in output],
          'Budget Percentage': [output[code][1] for code in output],
-         'Country Name': [map_data[code].name for code in map_data]}
+         'Country Name': [map_data[code].name for code in output]}
 
     keys = list(factor_proportionality.keys())
 
     for factor in keys:
-        d[factor] = [map_data[code].factors[factor] for code in map_data]
+        d[factor] = [map_data[code].factors[factor] for code in output]
 
     keys.append('Budget Percentage')
-    print(sum(output[code][0] for code in output))
+
+    if progress is not None:
+        progress(70, 'Drawing map')
+
+    with stage('draw_map'):
+        return _choropleth(d, keys)
+
+
+def _choropleth(d: Dict[str, list], keys: List[str]):
+    """Draws the budget of each country of d, showing the columns of keys on hover"""
+    import plotly.express as px
+    import pandas
 
     df = pandas.DataFrame(data=d)
     fig = px.choropleth(df, locations="Iso Code",
@@ -42,4 +101,167 @@ def run(total_budget: float, factor_proportionality: Dict[str, str], weights: Di
                         hover_data=keys,
                         color_continuous_scale=px.colors.sequential.Plasma)
 
-    fig.show()
+    return fig
+
+
+class MapTemplate:
+    """The map of the budgets of a year for a set of factors, drawn and serialized
+    once so that the map of each scenario only swaps in its budget arrays.
+
+    Instance Attributes:
+        - year: the year being mapped
+        - factors: the factors of the scenarios, shown on hover
+    """
+    year: str
+    factors: List[str]
+
+    def __init__(self, year: str, factors: List[str]) -> None:
+        import numpy
+        import plotly.io
+
+        self.year = year
+        self.factors = list(factors)
+        self._scores = factor_scores(year, self.factors)
+
+        countries = get_year_dataset(year).countries
+        self._factor_values = numpy.column_stack(
+            [numpy.frombuffer(countries.factors[factor], dtype=float) for factor in self.factors])
+
+        placeholder = [0.0] * len(self._scores.codes)
+        d = {'Iso Code': self._scores.codes, 'Budget': placeholder, 'Budget Percentage': placeholder,
+             'Country Name': [countries[code].name for code in self._scores.codes]}
+        for j, factor in enumerate(self.factors):
+            d[factor] = self._factor_values[:, j].tolist()
+
+        spec = json.loads(plotly.io.to_json(_choropleth(d, self.factors + ['Budget Percentage'])))
+        self._trace = spec['data'][0]
+        self._layout = json.dumps(spec['layout'])
+        self._is_binary = isinstance(self._trace['z'], dict)
+
+    def _encode(self, values: 'numpy.ndarray') -> Union[dict, list]:
+        """Serializes the array as the template's version of plotly does, either as
+        base64 typed array data or as a list.
+        """
+        import numpy
+
+        if not self._is_binary:
+            return values.tolist()
+
+        encoded = {'dtype': 'f8', 'bdata': base64.b64encode(numpy.ascontiguousarray(values, '<f8').tobytes()).decode()}
+        if values.ndim > 1:
+            encoded['shape'] = ', '.join(str(length) for length in values.shape)
+
+        return encoded
+
+    def figure_json(self, total_budget: float, factor_proportionality: Dict[str, str],
+                    weights: Dict[str, float]) -> str:
+        """Provides the plotly json of the map of the scenario
+
+        Precondition:
+            - factor_proportionality.keys() == weights.keys() == set(self.factors)
+        """
+        budget, percentage = allocation_arrays(self._scores, total_budget, factor_proportionality, weights)
+
+        return self.arrays_figure_json(budget, percentage)
+
+    def arrays_figure_json(self, budget: 'numpy.ndarray', percentage: 'numpy.ndarray') -> str:
+        """Provides the plotly json of the map of an allocation already computed, such
+        as the budget_arrays of an AllocationSession of the same year and factors.
+
+        Precondition:
+            - budget and percentage are ordered as factor_scores(self.year, self.factors).codes
+        """
+        import numpy
+
+        trace = dict(self._trace, z=self._encode(budget),
+                     customdata=self._encode(numpy.column_stack([self._factor_values, percentage])))
+
+        return '{"data": [' + json.dumps(trace) + '], "layout": ' + self._layout + '}'
+
+    def figure(self, total_budget: float, factor_proportionality: Dict[str, str], weights: Dict[str, float]):
+        """Provides the plotly figure of the map of the scenario"""
+        import plotly.io
+
+        return plotly.io.from_json(self.figure_json(total_budget, factor_proportionality, weights))
+
+
+def _plotly_js_tag(include_plotlyjs: Union[bool, str], directory: str) -> str:
+    """Provides the script tag loading plotly.js in an html map written to the
+    directory, inline if include_plotlyjs is True, from the plotly CDN if it is 'cdn'
+    or from a single copy in the directory, named after its version, if it is
+    'directory'.
+    """
+    import plotly.offline
+
+    version = plotly.offline.get_plotlyjs_version()
+
+    if include_plotlyjs == 'cdn':
+        return '<script src="https://cdn.plot.ly/plotly-' + version + '.min.js" charset="utf-8"></script>'
+    elif include_plotlyjs == 'directory':
+        file_name = PLOTLY_JS_FILE.replace('{version}', version)
+        shared_copy = os.path.join(directory, file_name)
+        if not os.path.exists(shared_copy):
+            file_descriptor, temporary_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            with os.fdopen(file_descriptor, 'w', encoding='utf-8') as js_file:
+                js_file.write(plotly.offline.get_plotlyjs())
+            os.replace(temporary_path, shared_copy)
+        return '<script src="' + file_name + '" charset="utf-8"></script>'
+    else:
+        return '<script type="text/javascript">' + plotly.offline.get_plotlyjs() + '</script>'
+
+
+def preview_page(directory: str) -> str:
+    """Provides the html page of the live preview map, loading plotly.js from a
+    single copy in the directory so that the page stays small.
+    """
+    os.makedirs(directory, exist_ok=True)
+    return _PREVIEW_PAGE.replace('{plotly_js}', _plotly_js_tag('directory', directory))
+
+
+@instrumented('export_maps')
+def export_maps(scenarios: Dict[str, Tuple[float, Dict[str, str], Dict[str, float], str]], directory: str,
+                file_format: str = 'html', include_plotlyjs: Union[bool, str] = True) -> List[str]:
+    """Writes the map of each scenario, given as its total budget, factor
+    proportionality, weights and year, to <name>.html or <name>.json in the
+    directory without opening a browser, and provides the paths written.
+
+    Scenarios sharing a year and factors reuse one MapTemplate. html maps are
+    self-contained unless include_plotlyjs is 'cdn' or 'directory'.
+
+    Precondition:
+        - file_format in {'html', 'json'}
+    """
+    os.makedirs(directory, exist_ok=True)
+    templates = {}
+    page = None
+    paths = []
+
+    if file_format == 'html':
+        page = _HTML_PAGE.replace('{plotly_js}', _plotly_js_tag(include_plotlyjs, directory)).split('{figure}')
+
+    for name, (total_budget, factor_proportionality, weights, year) in scenarios.items():
+        key = (year, tuple(factor_proportionality))
+        if key not in templates:
+            templates[key] = MapTemplate(year, list(factor_proportionality))
+        figure = templates[key].figure_json(total_budget, factor_proportionality, weights)
+
+        path = os.path.join(directory, name + '.' + file_format)
+        with open(path, 'w', encoding='utf-8') as map_file:
+            if page is None:
+                map_file.write(figure)
+            else:
+                map_file.write(page[0])
+                map_file.write(figure)
+                map_file.write(page[1])
+        paths.append(path)
+
+    return paths
+
+
+def run(total_budget: float, factor_proportionality: Dict[str, str], weights: Dict[str, float],
+        year: str) -> None:
+    """Plots the graph with the passed parameters"""
+    figure = build_figure(total_budget, factor_proportionality, weights, year)
+
+    with stage('show_map'):
+        figure.show()
@@ -1,16 +1,36 @@
+import math
+import os
 import sys
-from typing import Dict
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
 
 from PyQt5.QtWidgets import QApplication, QLabel, QComboBox, QLineEdit, QDialog
 from Application.Functionalities.cclm_application_window import CCLMApplicationWindow
 from PyQt5 import QtCore
+from PyQt5.QtCore import QThreadPool, QTimer, QUrl
 from Application.Layouts.home_user_input_layout import Ui_HomeMainWindow
 from Application.Layouts.precondition_failed_dialog import Ui_Dialog
 from Application.Layouts.weightage_user_input_layout import Ui_WeightageMainWindow
+from Application.Functionalities.worker import Worker
+from Computation.allocation_session import AllocationSession
+from Computation.dataset_cache import CACHE_DIRECTORY
 from Computation.dataset_utilities import possible_years, get_raw_datasets
-from Application.Functionalities.map import run
+from Application.Functionalities.map import MapTemplate, build_figure, preview_page
 
-app = QApplication(sys.argv)
+# QtWebEngineWidgets is optional and, when installed, must be imported before the QApplication is created.
+# Without it the WeightageWindow has no live preview map
+try:
+    from PyQt5.QtWebEngineWidgets import QWebEngineView
+except ImportError:
+    QWebEngineView = None
+
+# Milliseconds without a change to the weights or budget before the preview map is recomputed
+PREVIEW_DELAY = 150
+
+# Directory of the copy of plotly.js loaded by the preview map
+PREVIEW_DIRECTORY = os.path.join(CACHE_DIRECTORY, 'Preview')
+
+app = None
 
 
 class WarnDialog(QDialog, Ui_Dialog):
@@ -28,11 +48,19 @@ class HomeWindow(CCLMApplicationWindow, Ui_HomeMainWindow):
         self.setupUi(self)
         self.dataset_to_combo_box = {}
         self.dataset_to_correlation = {}
+        self.correlation_keys = []
 
-        self.year_drop_down.addItems(possible_years())
-        self.populate_grid()
-
+        self.begin_analysis.setEnabled(False)
         self.begin_analysis.clicked.connect(self.weight_win_open)
+        self.run_in_background(_load_home_data, self.datasets_loaded)
+
+    def datasets_loaded(self, home_data: Tuple[List[str], List[str]]) -> None:
+        """Fill the window with the years and datasets read on the worker thread"""
+        years, self.correlation_keys = home_data
+
+        self.year_drop_down.addItems(years)
+        self.populate_grid()
+        self.begin_analysis.setEnabled(True)
 
     def populate_grid(self) -> None:
         """Adds required Label and ComboBox items to
@@ -41,8 +69,7 @@ class HomeWindow(CCLMApplicationWindow, Ui_HomeMainWindow):
         Preconditions:
             - At least one csv file in Raw Computation
         """
-        temp_combo_year = str(self.year_drop_down.currentText())
-        correlation_keys = list(get_raw_datasets(temp_combo_year).keys())
+        correlation_keys = self.correlation_keys
         combo_box_items = ['direct', 'inverse']
 
         for i in range(len(correlation_keys)):
@@ -79,10 +106,26 @@ class WeightageWindow(CCLMApplicationWindow, Ui_WeightageMainWindow):
         self.dataset_to_line_edit = {}
         self.dataset_to_weightage = {}
 
+        self.preview_worker = None
+        self.preview_state = None
+        self.preview_lock = threading.Lock()
+        self.preview_loaded = False
+        self.pending_figure = None
+        self.preview_timer = QTimer(self)
+        self.preview_timer.setSingleShot(True)
+        self.preview_timer.setInterval(PREVIEW_DELAY)
+        self.preview_timer.timeout.connect(self.update_preview)
+
         self.populate_grid()
+        self.preview_view = self.add_preview_view()
 
+        self.budget.textChanged.connect(self.preview_timer.start)
         self.display_analysis.clicked.connect(self.map_win_open)
 
+    def analysis_stopped(self) -> None:
+        """Allow the analysis to be displayed again after it failed or was cancelled"""
+        self.display_analysis.setText('Display Analysis')
+
     def populate_grid(self) -> None:
         """Adds required Label and QLineEdit items to
         obtain weightage for all csv files in Responsibility Computation directory
@@ -98,6 +141,7 @@ class WeightageWindow(CCLMApplicationWindow, Ui_WeightageMainWindow):
             self.dataset_to_line_edit[data_key] = QLineEdit()
             current_edit = self.dataset_to_line_edit[data_key]
             current_edit.setFixedWidth(100)
+            current_edit.textChanged.connect(self.preview_timer.start)
             self.factor_form.addRow(label, current_edit)
 
         self.factor_form.setSpacing(30)
@@ -106,47 +150,175 @@ class WeightageWindow(CCLMApplicationWindow, Ui_WeightageMainWindow):
         """Evaluate all user input and check if it satisfies all
         preconditions of following functions involved in computation.
         """
-        try:
-            total_budget = float(self.budget.text())
-            is_budget_valid = total_budget >= 1000000
-
-            for line_edit in self.dataset_to_line_edit:
-                self.dataset_to_weightage[line_edit] = self.dataset_to_line_edit[line_edit].text()
-
-            is_sum_valid = sum(float(self.dataset_to_weightage[dataset])
-                               for dataset in self.dataset_to_weightage) == 100
+        for line_edit in self.dataset_to_line_edit:
+            self.dataset_to_weightage[line_edit] = self.dataset_to_line_edit[line_edit].text()
 
-            is_factor_valid = all(float(self.dataset_to_weightage[dataset]) >= 0
-                                  for dataset in self.dataset_to_weightage)
-
-            if is_factor_valid and is_sum_valid and is_budget_valid:
-                return True
-            else:
-                error_dialog = WarnDialog()
-                error_dialog.exec_()
-                return False
-        except ValueError:
+        if self.valid_inputs() is not None:
+            return True
+        else:
             error_dialog = WarnDialog()
             error_dialog.exec_()
             return False
 
     def map_win_open(self) -> None:
-        """Close the WeightageWindow and open the MapWindow"""
-
-        if self.precondition_evaluation():
+        """Compute the map on a worker thread, then close the WeightageWindow and
+        open the MapWindow. Cancels the computation if it is already running.
+        """
+        if self.worker is not None:
+            self.cancel_background_work()
+        elif self.precondition_evaluation():
+            self.cancel_preview()
             total_budget = float(self.budget.text())
             factor_proportionality = {data_name: self.dataset_to_correlation[data_name]
                                       for data_name in self.dataset_to_correlation}
             weights = {data_name: float(self.dataset_to_weightage[data_name]) / 100
                        for data_name in self.dataset_to_correlation}
+            year = self.year
+
+            def task(progress: Callable[[int, str], None]):
+                return build_figure(total_budget, factor_proportionality, weights, year, progress)
+
+            self.display_analysis.setText('Cancel')
+            self.run_in_background(task, self.map_ready, self.analysis_stopped)
+
+    def map_ready(self, fig) -> None:
+        """Show the map computed on the worker thread and move to the next window"""
+        fig.show()
+        self.next_window()
+
+    def add_preview_view(self) -> Optional['QWebEngineView']:
+        """Adds the web view showing the live preview map below the inputs, or
+        provides None if QtWebEngineWidgets is not installed.
+        """
+        if QWebEngineView is None:
+            self.statusBar().showMessage('Install PyQtWebEngine to preview the map while editing')
+            return None
+
+        view = QWebEngineView(self.centralwidget)
+        view.loadFinished.connect(self.preview_page_loaded)
+        view.setHtml(preview_page(PREVIEW_DIRECTORY), QUrl.fromLocalFile(PREVIEW_DIRECTORY + os.sep))
+        self.verticalLayout.addWidget(view, 1)
+        self.resize(self.width(), 900)
+
+        return view
+
+    def valid_inputs(self) -> Optional[Tuple[float, Dict[str, float]]]:
+        """Provides the budget and the weight of each factor as a fraction if they
+        satisfy the preconditions of the computation, without warning the user.
+        """
+        try:
+            total_budget = float(self.budget.text())
+            weights = {data_name: float(self.dataset_to_line_edit[data_name].text())
+                       for data_name in self.dataset_to_correlation}
+        except ValueError:
+            return None
+
+        if not all(math.isfinite(value) for value in [total_budget, *weights.values()]):
+            return None
+        elif total_budget < 1000000 or any(weights[data_name] < 0 for data_name in weights) \
+                or sum(weights.values()) != 100:
+            return None
 
-            run(total_budget, factor_proportionality,
-                weights, self.year)
-            self.next_window()
+        return total_budget, {data_name: weights[data_name] / 100 for data_name in weights}
+
+    def update_preview(self) -> None:
+        """Recompute the preview map on a worker thread once the inputs have stopped
+        changing for PREVIEW_DELAY milliseconds, cancelling the computation of any
+        earlier inputs.
+        """
+        inputs = self.valid_inputs()
+        if self.preview_view is None or inputs is None:
+            return
+
+        total_budget, weights = inputs
+        factor_proportionality = dict(self.dataset_to_correlation)
+        year = self.year
+        preview_state = self.preview_state
+        preview_lock = self.preview_lock
+
+        def task(progress: Callable[[int, str], None]) -> Tuple[Tuple[MapTemplate, AllocationSession], str]:
+            progress(0, 'Preparing preview')
+            if preview_state is not None:
+                template, session = preview_state
+            else:
+                template = MapTemplate(year, list(factor_proportionality))
+                session = AllocationSession(year, total_budget, factor_proportionality, weights)
+
+            progress(50, 'Allocating budget')
+            # A superseded task may still be running, so only one task at a time updates the session
+            with preview_lock:
+                for factor in weights:
+                    if session.weights[factor] != weights[factor]:
+                        session.set_weight(factor, weights[factor])
+                if session.total_budget != total_budget:
+                    session.set_budget(total_budget)
+                budget, percentage = session.budget_arrays()
+
+            return (template, session), template.arrays_figure_json(budget, percentage)
+
+        self.cancel_preview()
+        self.preview_worker = Worker(task)
+        worker = self.preview_worker
+
+        def finished(result: Tuple[Tuple[MapTemplate, AllocationSession], str]) -> None:
+            self.preview_state = result[0]
+            if self.preview_worker is worker:
+                self.preview_worker = None
+                self.show_preview(result[1])
+
+        worker.signals.finished.connect(finished)
+        QThreadPool.globalInstance().start(worker)
+
+    def show_preview(self, figure_json: str) -> None:
+        """Draw the figure in the preview map, updating the map already drawn in
+        place, once the page of the preview has loaded.
+        """
+        if not self.preview_loaded:
+            self.pending_figure = figure_json
+        else:
+            self.preview_view.page().runJavaScript('showFigure(' + figure_json + ');')
+
+    def preview_page_loaded(self, is_loaded: bool) -> None:
+        """Draw the figure computed while the page of the preview was loading"""
+        self.preview_loaded = is_loaded
+        if is_loaded and self.pending_figure is not None:
+            self.show_preview(self.pending_figure)
+            self.pending_figure = None
+
+    def cancel_preview(self) -> None:
+        """Stop waiting for the inputs to settle and cancel the computation of the
+        preview map, if any.
+        """
+        self.preview_timer.stop()
+        if self.preview_worker is not None:
+            self.preview_worker.cancel()
+            self.preview_worker = None
+
+    def closeEvent(self, event) -> None:
+        """Cancel the computation of the preview map when the window is closed"""
+        self.cancel_preview()
+        super().closeEvent(event)
+
+
+def _load_home_data(progress: Callable[[int, str], None]) -> Tuple[List[str], List[str]]:
+    """Provides the years that can be analyzed and the names of the responsibility
+    datasets, for the HomeWindow to be filled with.
+    """
+    progress(0, 'Finding years to analyze')
+    years = possible_years()
+
+    progress(90, 'Reading datasets')
+    correlation_keys = list(get_raw_datasets(years[0]).keys()) if years else []
+
+    return years, correlation_keys
 
 
 def run_app() -> None:
     """Runs the home application"""
+    global app
+    if app is None:
+        app = QApplication(sys.argv)
+
     gui_home = HomeWindow()
     gui_home.show()
     sys.exit(app.exec_())
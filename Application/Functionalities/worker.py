@@ -0,0 +1,66 @@
+from typing import Any, Callable
+
+from PyQt5.QtCore import QObject, QRunnable, pyqtSignal
+
+from Computation.instrumentation import profile_current_thread
+
+
+class TaskCancelled(Exception):
+    """Raised inside a task reporting progress after it has been cancelled"""
+
+
+class WorkerSignals(QObject):
+    """Signals emitted by a Worker, delivered on the thread of the receiver"""
+    progress = pyqtSignal(int, str)
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+
+class Worker(QRunnable):
+    """Runs a task on a QThreadPool thread, so that the window starting it stays
+    responsive.
+
+    The task is called with a function taking a percentage and a message, which
+    it must call between its stages. The function emits the progress signal and
+    stops the task by raising TaskCancelled once the worker has been cancelled.
+    Exactly one of finished (with the result of the task), failed or cancelled is
+    emitted at the end.
+    """
+
+    def __init__(self, task: Callable[[Callable[[int, str], None]], Any]) -> None:
+        super().__init__()
+
+        self.task = task
+        self.signals = WorkerSignals()
+        self.is_cancelled = False
+
+    def cancel(self) -> None:
+        """Stop the task the next time it reports its progress"""
+        self.is_cancelled = True
+
+    def report_progress(self, percentage: int, message: str) -> None:
+        """Emit the progress of the task, unless it has been cancelled
+
+        Precondition:
+            - 0 <= percentage <= 100
+        """
+        if self.is_cancelled:
+            raise TaskCancelled
+
+        self.signals.progress.emit(percentage, message)
+
+    def run(self) -> None:
+        """Run the task and emit how it ended"""
+        profile_current_thread()
+        try:
+            result = self.task(self.report_progress)
+        except TaskCancelled:
+            self.signals.cancelled.emit()
+        except Exception as error:
+            self.signals.failed.emit(str(error))
+        else:
+            if self.is_cancelled:
+                self.signals.cancelled.emit()
+            else:
+                self.signals.finished.emit(result)
@@ -0,0 +1,151 @@
+"""Times the dataset loader and allocation hot paths, on the shipped datasets or
+on synthetic datasets generated by Benchmarks.synthetic_datasets.
+
+Run from the root directory of the project, for example:
+    python -m Benchmarks.hot_paths
+    python -m Benchmarks.hot_paths --entities 10000 --factors 50 --years 70 --json results.json
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import timeit
+import warnings
+from typing import Callable, Dict, List, Optional, Tuple
+
+from Benchmarks import synthetic_datasets
+from Computation import computation, dataset_cache, dataset_utilities, result_cache
+from Application.Functionalities import map
+
+
+def _warm_disk() -> None:
+    """Discards every dataset and allocation held in memory, leaving only the compiled
+    tables on disk
+    """
+    dataset_utilities.YEAR_DATASETS.invalidate()
+    result_cache.ALLOCATIONS.clear()
+
+
+def _cold() -> None:
+    """Discards every dataset and allocation held in memory along with the compiled
+    tables, so that every dataset is parsed again. The compiled tables are those of
+    the temporary CACHE_DIRECTORY the benchmark runs with.
+    """
+    _warm_disk()
+    dataset_cache.clear_compiled_tables()
+
+
+def _warm(year: str) -> Callable[[], None]:
+    """Provides a setup making sure the datasets of the year are held in memory,
+    without any allocation cached
+    """
+    def setup() -> None:
+        result_cache.ALLOCATIONS.clear()
+        dataset_utilities.get_year_dataset(year)
+
+    return setup
+
+
+def _cached(year: str, proportionality: Dict[str, str], weights: Dict[str, float]) -> Callable[[], None]:
+    """Provides a setup making sure the allocation of the scenario is cached"""
+    def setup() -> None:
+        result_cache.cached_allocation(1e9, proportionality, weights, year)
+
+    return setup
+
+
+def _budget_details_all(year: str, proportionality: Dict[str, str], weights: Dict[str, float]) -> None:
+    """Calls budget_details for every country of the year"""
+    dataset = computation.set_up_computation(year)
+    for code in dataset.countries:
+        computation.budget_details(1e9, dataset.countries[code], proportionality, weights, dataset)
+
+
+def cases(year: str, factors: List[str]) -> List[Tuple[str, Callable[[], None], Callable[[], None]]]:
+    """Provides the name, setup and benchmarked function of every case"""
+    proportionality = {factor: 'direct' if i % 2 == 0 else 'inverse' for i, factor in enumerate(factors)}
+    weights = {factor: 1 / len(factors) for factor in factors}
+    first_dataset = dataset_utilities._responsibility_dataset_paths()[factors[0]]
+
+    return [
+        ('_extract_wanted_column (cold)', _cold,
+         lambda: dataset_utilities._extract_wanted_column(first_dataset, year)),
+        ('_extract_wanted_column (warm disk)', _warm_disk,
+         lambda: dataset_utilities._extract_wanted_column(first_dataset, year)),
+        ('_extract_wanted_column (warm)', _warm(year),
+         lambda: dataset_utilities._extract_wanted_column(first_dataset, year)),
+        ('get_raw_datasets (cold)', _cold, lambda: dataset_utilities.get_raw_datasets(year)),
+        ('get_raw_datasets (warm disk)', _warm_disk, lambda: dataset_utilities.get_raw_datasets(year)),
+        ('get_raw_datasets (warm)', _warm(year), lambda: dataset_utilities.get_raw_datasets(year)),
+        ('map_iso_to_country', _warm(year), lambda: dataset_utilities.map_iso_to_country(year)),
+        ('get_clean_datasets', _warm(year), lambda: dataset_utilities.get_clean_datasets(year)),
+        ('get_year_dataset (cold)', _cold, lambda: dataset_utilities.get_year_dataset(year)),
+        ('get_year_dataset (warm disk)', _warm_disk, lambda: dataset_utilities.get_year_dataset(year)),
+        ('possible_years (cold)', _cold, dataset_utilities.possible_years),
+        ('possible_years (warm disk)', _warm_disk, dataset_utilities.possible_years),
+        ('budget_details, all countries', _warm(year),
+         lambda: _budget_details_all(year, proportionality, weights)),
+        ('allocate_budget', _warm(year), lambda: computation.allocate_budget(1e9, proportionality, weights, year)),
+        ('map._plot', _warm(year), lambda: map._plot(1e9, proportionality, weights, year)),
+        ('map._plot (cached)', _cached(year, proportionality, weights),
+         lambda: map._plot(1e9, proportionality, weights, year)),
+    ]
+
+
+def run(repeat: int) -> Dict[str, float]:
+    """Return the best time in milliseconds, out of repeat runs, of every case on the
+    datasets in dataset_utilities.RAW_DATASETS_PATH. Prints each time as it is taken.
+    """
+    _cold()
+    year = dataset_utilities.possible_years()[-1]
+    factors = list(dataset_utilities.get_year_dataset(year).clean)
+    results = {}
+
+    for name, setup, function in cases(year, factors):
+        times = timeit.repeat(function, setup, number=1, repeat=repeat)
+        results[name] = min(times) * 1000
+        print(f'{name:<40}{results[name]:>12.3f} ms')
+
+    return results
+
+
+def main(arguments: Optional[List[str]] = None) -> None:
+    """Benchmarks the shipped datasets, or synthetic datasets if --entities is given"""
+    parser = argparse.ArgumentParser(description='Benchmark the loader and allocation hot paths.')
+    parser.add_argument('--entities', type=int, help='number of synthetic entities')
+    parser.add_argument('--factors', type=int, default=10, help='number of synthetic responsibility datasets')
+    parser.add_argument('--years', type=int, default=70, help='number of synthetic year columns')
+    parser.add_argument('--repeat', type=int, default=5, help='runs of each case, the best is reported')
+    parser.add_argument('--json', help='file to write the results to')
+    args = parser.parse_args(arguments)
+
+    warnings.simplefilter('ignore', RuntimeWarning)
+    shipped_path = dataset_utilities.RAW_DATASETS_PATH
+    shipped_cache = dataset_cache.CACHE_DIRECTORY
+
+    with tempfile.TemporaryDirectory() as directory:
+        # Cold cases remove the compiled tables, so the benchmark never uses the ones of the project
+        dataset_cache.CACHE_DIRECTORY = os.path.join(directory, 'Compiled Datasets')
+
+        if args.entities is not None:
+            print(f'Generating {args.entities} entities x {args.factors} factors x {args.years} years')
+            synthetic_datasets.generate(os.path.join(directory, 'Raw Datasets'), args.entities,
+                                        args.factors, args.years)
+            dataset_utilities.RAW_DATASETS_PATH = os.path.join(directory, 'Raw Datasets')
+
+        try:
+            results = run(args.repeat)
+        finally:
+            dataset_utilities.RAW_DATASETS_PATH = shipped_path
+            dataset_cache.CACHE_DIRECTORY = shipped_cache
+            _warm_disk()
+
+    if args.json is not None:
+        with open(args.json, 'w') as json_file:
+            json.dump({'entities': args.entities, 'factors': args.factors, 'years': args.years,
+                       'milliseconds': results}, json_file, indent=1)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
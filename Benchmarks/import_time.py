@@ -0,0 +1,54 @@
+"""Checks the time taken to import the modules used by batch jobs against
+their startup budgets, using the numbers reported by python -X importtime.
+
+Run from the root directory of the project:
+    python -m Benchmarks.import_time
+"""
+import subprocess
+import sys
+from typing import Dict
+
+from path import GLOBAL_PROJECT_PATH
+
+# Budget of each module, in milliseconds of cumulative import time
+IMPORT_BUDGETS = {
+    'Computation.computation': 50.0,
+    'Computation.dataset_utilities': 50.0,
+    'batch': 60.0,
+}
+
+
+def import_times(module: str) -> Dict[str, float]:
+    """Return the cumulative import time, in milliseconds, of every module imported
+    by a new interpreter importing module.
+    """
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import ' + module],
+                             cwd=GLOBAL_PROJECT_PATH, capture_output=True, text=True, check=True)
+    times = {}
+
+    for line in process.stderr.splitlines():
+        if line.startswith('import time:') and not line.endswith('| imported package'):
+            _, cumulative, name = line[len('import time:'):].split('|')
+            if cumulative.strip().isdigit():
+                times[name.strip()] = int(cumulative) / 1000
+
+    return times
+
+
+def run() -> bool:
+    """Prints the import time of every budgeted module and return whether all of
+    them are within budget. The best of three imports is taken for each module.
+    """
+    within_budget = True
+
+    for module in IMPORT_BUDGETS:
+        best = min(import_times(module)[module] for _ in range(3))
+        status = 'ok' if best <= IMPORT_BUDGETS[module] else 'OVER BUDGET'
+        within_budget = within_budget and best <= IMPORT_BUDGETS[module]
+        print(f'{module:<35}{best:>9.1f} ms  (budget {IMPORT_BUDGETS[module]:.0f} ms)  {status}')
+
+    return within_budget
+
+
+if __name__ == '__main__':
+    sys.exit(0 if run() else 1)
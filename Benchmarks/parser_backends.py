@@ -0,0 +1,68 @@
+"""Checks that every installed csv parser backend of the dataset loader reads the
+shipped Raw Datasets into identical tables, and times each of them.
+
+Run from the root directory of the project:
+    python -m Benchmarks.parser_backends
+"""
+import glob
+import importlib.util
+import os
+import sys
+import timeit
+from typing import Dict, List
+
+import numpy
+
+from Computation import dataset_utilities
+
+
+def _independent_columns(file_name: str) -> List[str]:
+    """Return the independent columns the loader reads the file with"""
+    if os.path.basename(file_name).startswith('countries_codes_and_coordinates'):
+        return ['Country', '']
+    else:
+        return ['Country Code', 'Country Name']
+
+
+def _tables_equal(first: dataset_utilities.DatasetTable, second: dataset_utilities.DatasetTable) -> bool:
+    """Return whether the tables hold the same keys, columns, numbers and text"""
+    return first.keys == second.keys and first.columns == second.columns and first.text == second.text \
+        and numpy.array_equal(first.values, second.values, equal_nan=True)
+
+
+def run() -> bool:
+    """Prints the time each installed backend takes to read every shipped dataset and
+    return whether all of them read identical tables.
+    """
+    file_names = sorted(glob.glob(os.path.join(dataset_utilities.RAW_DATASETS_PATH, '*', '*.csv')))
+    shipped_backend = dataset_utilities.PARSER_BACKEND
+    tables: Dict[str, List[dataset_utilities.DatasetTable]] = {}
+    all_equal = True
+
+    try:
+        for backend in dataset_utilities.PARSER_BACKENDS:
+            dataset_utilities.PARSER_BACKEND = backend
+            if backend != 'csv' and importlib.util.find_spec(backend) is None:
+                print(f'{backend:<10} not installed')
+                continue
+
+            def read_all() -> List[dataset_utilities.DatasetTable]:
+                return [dataset_utilities._read_all_columns(name, *_independent_columns(name)) for name in file_names]
+
+            tables[backend] = read_all()
+            best = min(timeit.repeat(read_all, number=1, repeat=5)) * 1000
+            print(f'{backend:<10}{best:>10.2f} ms')
+    finally:
+        dataset_utilities.PARSER_BACKEND = shipped_backend
+
+    for backend in tables:
+        for name, table, reference in zip(file_names, tables[backend], tables['csv']):
+            if not _tables_equal(table, reference):
+                all_equal = False
+                print(f'{backend} differs from csv on {os.path.basename(name)}')
+
+    return all_equal
+
+
+if __name__ == '__main__':
+    sys.exit(0 if run() else 1)
@@ -0,0 +1,80 @@
+"""Generates synthetic datasets laid out like Computation/Raw Datasets, so that
+the loader and the computation can be benchmarked at sizes beyond the shipped data.
+"""
+import csv
+import itertools
+import os
+import random
+import string
+from typing import List
+
+FIRST_YEAR = 1951
+
+
+def entity_codes(entity_count: int) -> List[str]:
+    """Provides entity_count distinct three letter codes
+
+    Precondition:
+        - entity_count <= 26 ** 3
+    """
+    letters = itertools.product(string.ascii_uppercase, repeat=3)
+    return [''.join(code) for code in itertools.islice(letters, entity_count)]
+
+
+def _write_indicator(file_name: str, indicator: str, codes: List[str], years: List[str],
+                     missing_fraction: float, generator: random.Random, by_name: bool = False) -> None:
+    """Writes a dataset in the format of the World Bank csv files in Raw Datasets,
+    or keyed only by 'Country Name' if by_name.
+    """
+    with open(file_name, 'w', newline='') as csv_file:
+        writer = csv.writer(csv_file, quoting=csv.QUOTE_MINIMAL if by_name else csv.QUOTE_ALL)
+
+        if by_name:
+            writer.writerow(['Country Name'] + years)
+        else:
+            writer.writerow(['Country Name', 'Country Code', 'Indicator Name', 'Indicator Code'] + years)
+
+        for code in codes:
+            scale = generator.uniform(1, 1000)
+            values = ['' if generator.random() < missing_fraction else repr(scale * generator.uniform(0.5, 1.5))
+                      for _ in years]
+            if by_name:
+                writer.writerow(['Entity ' + code] + values)
+            else:
+                writer.writerow(['Entity ' + code, code, indicator, indicator.upper()] + values)
+
+
+def generate(directory: str, entity_count: int, factor_count: int, year_count: int,
+             missing_fraction: float = 0.05, seed: int = 0) -> None:
+    """Writes Constant Datasets and Responsibility Datasets directories into
+    directory with entity_count entities, factor_count responsibility datasets and
+    year_count year columns starting from FIRST_YEAR. The first responsibility
+    dataset is keyed by name, as Climate Risk Index.csv is, and the others by code.
+
+    Preconditions:
+        - 1 <= entity_count <= 26 ** 3
+        - factor_count >= 1
+        - 0 <= missing_fraction < 1
+    """
+    generator = random.Random(seed)
+    codes = entity_codes(entity_count)
+    years = [str(FIRST_YEAR + i) for i in range(year_count)]
+
+    constant_path = os.path.join(directory, 'Constant Datasets')
+    responsibility_path = os.path.join(directory, 'Responsibility Datasets')
+    os.makedirs(constant_path, exist_ok=True)
+    os.makedirs(responsibility_path, exist_ok=True)
+
+    with open(os.path.join(constant_path, 'countries_codes_and_coordinates.csv'), 'w', newline='') as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(['Country', 'Alpha-2 code', 'Alpha-3 code', 'Numeric code',
+                         'Latitude (average)', 'Longitude (average)'])
+        for i, code in enumerate(codes):
+            writer.writerow(['Entity ' + code, code[:2], code, i, 0, 0])
+
+    _write_indicator(os.path.join(constant_path, 'GDP.csv'), 'gdp', codes, years, 0.0, generator)
+
+    for factor in range(factor_count):
+        name = 'Factor ' + str(factor)
+        _write_indicator(os.path.join(responsibility_path, name + '.csv'), name.lower(), codes, years,
+                         missing_fraction, generator, by_name=factor == 0)
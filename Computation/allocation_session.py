@@ -0,0 +1,97 @@
+from Computation.computation import factor_scores
+from typing import Dict, List, Tuple
+import numpy
+
+
+class AllocationSession:
+    """An allocation of the budget of a year that is kept up to date as the
+    budget, weights and proportionality change one at a time.
+
+    The direct and inverse scores of every factor are computed once. Each factor's
+    weighted score is held in a column, so a change only recomputes the column of
+    the factor that changed before adding the columns up again.
+
+    Instance Attributes:
+        - year: the year being analyzed
+        - codes: the iso code of each country, in the order of the result arrays
+        - factors: the factors being weighted
+        - total_budget: the budget being allocated
+        - weights: the weight of each factor
+        - factor_proportionality: the relation, direct or inverse, of each factor
+
+    Representation Invariants:
+        - self.total_budget >= 1,000,000
+        - self.weights.keys() == self.factor_proportionality.keys() == set(self.factors)
+    """
+    year: str
+    codes: List[str]
+    factors: List[str]
+    total_budget: float
+    weights: Dict[str, float]
+    factor_proportionality: Dict[str, str]
+
+    def __init__(self, year: str, total_budget: float, factor_proportionality: Dict[str, str],
+                 weights: Dict[str, float]) -> None:
+        self._scores = factor_scores(year, list(factor_proportionality))
+        self.year = year
+        self.codes = self._scores.codes
+        self.factors = self._scores.factors
+        self.total_budget = total_budget
+        self.weights = dict(weights)
+        self.factor_proportionality = dict(factor_proportionality)
+
+        self._column_of_factor = {factor: j for j, factor in enumerate(self.factors)}
+        self._weighted_scores = numpy.empty((len(self.codes), len(self.factors)))
+        for factor in self.factors:
+            self._update_factor(factor)
+
+    def _update_factor(self, factor: str) -> None:
+        """Recompute the weighted score of the factor for every country"""
+        j = self._column_of_factor[factor]
+        scores = self._scores.direct if self.factor_proportionality[factor] == 'direct' else self._scores.inverse
+
+        numpy.multiply(scores[:, j], self.weights[factor], out=self._weighted_scores[:, j])
+
+    def set_weight(self, factor: str, weight: float) -> None:
+        """Change the weight of the factor
+
+        Precondition:
+            - factor in self.factors
+            - weight >= 0
+        """
+        self.weights[factor] = weight
+        self._update_factor(factor)
+
+    def set_proportionality(self, factor: str, relation: str) -> None:
+        """Change the relation of the factor
+
+        Precondition:
+            - factor in self.factors
+            - relation in {'direct', 'inverse'}
+        """
+        self.factor_proportionality[factor] = relation
+        self._update_factor(factor)
+
+    def set_budget(self, total_budget: float) -> None:
+        """Change the budget being allocated
+
+        Precondition:
+            - total_budget >= 1,000,000
+        """
+        self.total_budget = total_budget
+
+    def budget_arrays(self) -> Tuple[numpy.ndarray, numpy.ndarray]:
+        """Return the budget and the budget percentage of each country, ordered as codes"""
+        budget = self._weighted_scores.sum(axis=1) * self.total_budget
+        percentage = budget / self._scores.gdp * 100
+
+        return budget, percentage
+
+    def allocation(self) -> Dict[str, Tuple[float, float]]:
+        """Return the budget and the budget percentage of every country, as given by
+        allocate_budget with the current budget, weights and proportionality.
+        """
+        budget, percentage = self.budget_arrays()
+
+        return {code: (code_budget, code_percentage)
+                for code, code_budget, code_percentage in zip(self.codes, budget.tolist(), percentage.tolist())}
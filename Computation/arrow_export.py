@@ -0,0 +1,151 @@
+from Computation.computation import allocation_arrays, factor_scores
+from Computation.dataset_utilities import DatasetTable, _year_indexed_table, get_year_dataset
+from typing import Dict, List, Tuple, TYPE_CHECKING
+import os
+
+if TYPE_CHECKING:
+    import pyarrow
+
+# Name of the file written in each partition directory
+PARTITION_FILE = 'part-0.parquet'
+
+
+def _float_column(values) -> 'pyarrow.Array':
+    """Provides an arrow array sharing the memory of the floats in values, which
+    is a contiguous float64 numpy array.
+    """
+    import pyarrow
+
+    buffer = pyarrow.py_buffer(values)
+    return pyarrow.Array.from_buffers(pyarrow.float64(), buffer.size // 8, [None, buffer])
+
+
+def year_dataset_table(year: str) -> 'pyarrow.Table':
+    """Provides the cleaned countries of the year, as in get_clean_datasets, as an
+    arrow table with the iso code, name and constant dataset gdp of each country
+    and a column for each factor. The numeric columns share the memory of the
+    year's dataset.
+
+    Precondition:
+        - year in possible_years()
+    """
+    import pyarrow
+
+    countries = get_year_dataset(year).countries
+    columns = {'Iso Code': pyarrow.array(countries.codes, pyarrow.string()),
+               'Country Name': pyarrow.array(countries.names, pyarrow.string()),
+               'Constant GDP': _float_column(countries.gdp)}
+    for factor in countries.factors:
+        columns[factor] = _float_column(countries.factors[factor])
+
+    return pyarrow.table(columns)
+
+
+def allocation_table(total_budget: float, factor_proportionality: Dict[str, str], weights: Dict[str, float],
+                     year: str) -> 'pyarrow.Table':
+    """Provides the budget and budget percentage of every country in the scenario,
+    as given by allocate_budget, as an arrow table sharing the memory of the
+    computed arrays.
+
+    Preconditions:
+        - the preconditions of allocate_budget hold
+    """
+    import pyarrow
+
+    scores = factor_scores(year, list(factor_proportionality))
+    budget, percentage = allocation_arrays(scores, total_budget, factor_proportionality, weights)
+    countries = get_year_dataset(year).countries
+
+    return pyarrow.table({'Iso Code': pyarrow.array(scores.codes, pyarrow.string()),
+                          'Country Name': pyarrow.array([countries[code].name for code in scores.codes],
+                                                        pyarrow.string()),
+                          'Budget': _float_column(budget),
+                          'Budget Percentage': _float_column(percentage)})
+
+
+def _write_partition(table: 'pyarrow.Table', directory: str, partition: List[Tuple[str, str]]) -> str:
+    """Writes the table to the hive style partition directory <column>=<value>/...
+    of the directory, replacing what was written there before, and provides the
+    path written.
+    """
+    import pyarrow.parquet
+
+    partition_directory = os.path.join(directory, *[column + '=' + value for column, value in partition])
+    os.makedirs(partition_directory, exist_ok=True)
+
+    path = os.path.join(partition_directory, PARTITION_FILE)
+    pyarrow.parquet.write_table(table, path)
+
+    return path
+
+
+def write_year_datasets(years: List[str], directory: str) -> List[str]:
+    """Writes the year_dataset_table of each year to the directory as parquet,
+    partitioned by Year, and provides the paths written.
+    """
+    return [_write_partition(year_dataset_table(year), directory, [('Year', year)]) for year in years]
+
+
+def write_allocations(scenarios: Dict[str, Tuple[float, Dict[str, str], Dict[str, float], str]],
+                      directory: str) -> List[str]:
+    """Writes the allocation_table of each scenario, given by name as its total
+    budget, factor proportionality, weights and year, to the directory as parquet,
+    partitioned by Year and Scenario, and provides the paths written.
+    """
+    paths = []
+
+    for name, (total_budget, factor_proportionality, weights, year) in scenarios.items():
+        table = allocation_table(total_budget, factor_proportionality, weights, year)
+        paths.append(_write_partition(table, directory, [('Year', year), ('Scenario', name)]))
+
+    return paths
+
+
+def read_partitioned(directory: str) -> 'pyarrow.Table':
+    """Reads every partition written to the directory by write_year_datasets or
+    write_allocations into one table, with the partition values as string columns.
+    """
+    import pyarrow
+    import pyarrow.dataset
+
+    partition_columns = set()
+    for _, subdirectories, _ in os.walk(directory):
+        partition_columns.update(name.split('=', 1)[0] for name in subdirectories if '=' in name)
+
+    partitioning = pyarrow.dataset.partitioning(
+        pyarrow.schema([(column, pyarrow.string()) for column in sorted(partition_columns)]), flavor='hive')
+
+    return pyarrow.dataset.dataset(directory, format='parquet', partitioning=partitioning).to_table()
+
+
+def dataset_table(table: DatasetTable) -> 'pyarrow.Table':
+    """Provides the table read from a raw dataset as an arrow table with its original
+    columns, as floats with nulls for missing values or as strings, and one row
+    per key, so that it can stand in for the raw dataset.
+    """
+    import numpy
+    import pyarrow
+
+    columns = {}
+    for j, column in enumerate(table.columns):
+        if column in table.text:
+            columns[column] = pyarrow.array(table.text[column], pyarrow.string())
+        else:
+            columns[column] = pyarrow.array(table.values[j], mask=numpy.isnan(table.values[j]))
+
+    return pyarrow.table(columns)
+
+
+def dataset_to_parquet(file_name: str, parquet_name: str, independent_column: str = 'Country Code',
+                       back_up_independent_column: str = 'Country Name') -> None:
+    """Converts a raw dataset to a parquet file that the loader reads in its place.
+    Rows are deduplicated by iso code, as the loader does.
+
+    Precondition:
+        - file_name is a dataset the loader can read with the independent columns
+        - the columns of the dataset have distinct, non-empty names
+    """
+    import pyarrow.parquet
+
+    table = _year_indexed_table(file_name, independent_column, back_up_independent_column)
+    pyarrow.parquet.write_table(dataset_table(table), parquet_name)
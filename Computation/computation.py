@@ -1,53 +1,48 @@
-from Computation.dataset_utilities import Country, get_clean_datasets
-from typing import Dict, Tuple
+from Computation.dataset_utilities import Country, CountryStore, FactorStatistics, YearDataset, get_year_dataset
+from Computation.instrumentation import instrumented
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple, TYPE_CHECKING
 
-CLEAN_DATASET = {}
+if TYPE_CHECKING:
+    import numpy
 
+ACTIVE_DATASET = None
 
-def set_up_computation(year: str) -> None:
+
+@instrumented('set_up_computation')
+def set_up_computation(year: str) -> YearDataset:
     """Decrease computation time by calling the clean
-    dataset once and providing th value to global constant
+    dataset once and making it the dataset used when none is given
 
     Precondition:
-        - Must be called before any computation is done.
+        - Must be called before any computation is done without a dataset.
     """
-    global CLEAN_DATASET
-    CLEAN_DATASET = get_clean_datasets(year)
-
-
-def _calculate_total(factor: str) -> float:
-    """Calculates the total of the factor passed"""
-    total = 0.0
-
-    for countries in CLEAN_DATASET[factor]:
-        if CLEAN_DATASET[factor][countries] != -999:
-            total += CLEAN_DATASET[factor][countries]
-
-    return total
+    global ACTIVE_DATASET
+    ACTIVE_DATASET = get_year_dataset(year)
+    return ACTIVE_DATASET
 
 
-def _positive_calculation(factor: str, country: Country) -> float:
+def _positive_calculation(factor: str, country: Country, statistics: FactorStatistics) -> float:
     """Calculates the weighted responsibility if the relation is positive."""
-    total_data = _calculate_total(factor)
+    total_data = statistics.total
     country_data = country.factors[factor]
     calc = country_data / total_data
 
     return calc
 
 
-def _negative_calculation(factor: str, country: Country) -> float:
+def _negative_calculation(factor: str, country: Country, statistics: FactorStatistics) -> float:
     """Calculates the weighted responsibility if the relation is negative."""
-    total_data = _calculate_total(factor)
+    total_data = statistics.total
     country_data = country.factors[factor]
-    sum_so_far = sum([total_data - float(CLEAN_DATASET[factor][i]) for i in
-                      CLEAN_DATASET[factor]])
+    sum_so_far = statistics.inverse_denominator
     calc = (total_data - country_data) / sum_so_far
 
     return calc
 
 
-def _responsibility(weights: Dict[str, float],
-                    country: Country, factor_proportionality: Dict[str, str]) -> float:
+def _responsibility(weights: Dict[str, float], country: Country,
+                    factor_proportionality: Dict[str, str], dataset: YearDataset) -> float:
     """Calculates the responsibility of the given country.
 
     Preconditions:
@@ -59,10 +54,11 @@ def _responsibility(weights: Dict[str, float],
 
     for factor in country.factors:
 
+        statistics = dataset.factor_statistics[factor]
         if factor_proportionality[factor] == 'direct':
-            result = _positive_calculation(factor, country)
+            result = _positive_calculation(factor, country, statistics)
         else:
-            result = _negative_calculation(factor, country)
+            result = _negative_calculation(factor, country, statistics)
 
         score[factor] = result
 
@@ -72,9 +68,10 @@ def _responsibility(weights: Dict[str, float],
     return weighted_result
 
 
-def budget_details(total_budget: float, country: Country,
-                   factor_proportionality: Dict[str, str], weights: Dict[str, float]) -> Tuple[float, float]:
+def budget_details(total_budget: float, country: Country, factor_proportionality: Dict[str, str],
+                   weights: Dict[str, float], dataset: Optional[YearDataset] = None) -> Tuple[float, float]:
     """Calculates the budget and the budget percentage based on the responsibility of the country
+    among the countries of dataset, or of the dataset set up by set_up_computation if none is given.
 
     Preconditions:
         - all(factor_proportionality[factor] == 'direct' or
@@ -82,6 +79,92 @@ def budget_details(total_budget: float, country: Country,
         - factor_proportionality.keys() == weights.keys()
         - total_budget >= 1,000,000
     """
-    budget = _responsibility(weights, country, factor_proportionality) * total_budget
+    if dataset is None:
+        dataset = ACTIVE_DATASET
+
+    budget = _responsibility(weights, country, factor_proportionality, dataset) * total_budget
     percentage = budget / country.gdp * 100
     return budget, percentage
+
+
+@dataclass(frozen=True)
+class FactorScores:
+    """Class for maintaining the score of every country for every factor of a
+    year, under both a direct and an inverse relation. Rows follow codes and
+    columns follow factors."""
+    year: str
+    codes: List[str]
+    factors: List[str]
+    direct: 'numpy.ndarray'
+    inverse: 'numpy.ndarray'
+    gdp: 'numpy.ndarray'
+
+
+def _factor_matrix(countries: CountryStore, factors: List[str]) -> Tuple['numpy.ndarray', 'numpy.ndarray']:
+    """Provides a countries x factors matrix of the factor data and a vector of
+    the gdp of each country, both ordered as countries and factors are.
+    """
+    import numpy
+
+    matrix = numpy.empty((len(countries), len(factors)))
+    for j, factor in enumerate(factors):
+        matrix[:, j] = numpy.frombuffer(countries.factors[factor], dtype=float)
+    gdp = numpy.array(countries.gdp, dtype=float)
+
+    return matrix, gdp
+
+
+@instrumented('factor_scores')
+def factor_scores(year: str, factors: List[str]) -> FactorScores:
+    """Calculates the direct and inverse score of every country with data in the
+    given year for each of the factors.
+
+    Precondition:
+        - all(factor in get_year_dataset(year).clean for factor in factors)
+    """
+    countries = get_year_dataset(year).countries
+    matrix, gdp = _factor_matrix(countries, factors)
+
+    totals = matrix.sum(axis=0)
+    remainders = totals - matrix
+
+    return FactorScores(year, list(countries), list(factors), matrix / totals,
+                        remainders / remainders.sum(axis=0), gdp)
+
+
+def allocation_arrays(scores: FactorScores, total_budget: float, factor_proportionality: Dict[str, str],
+                      weights: Dict[str, float]) -> Tuple['numpy.ndarray', 'numpy.ndarray']:
+    """Calculates the budget and the budget percentage of every country of the
+    scores, ordered as scores.codes.
+
+    Preconditions:
+        - factor_proportionality.keys() == weights.keys() == set(scores.factors)
+    """
+    import numpy
+
+    is_direct = numpy.array([factor_proportionality[factor] == 'direct' for factor in scores.factors])
+    score = numpy.where(is_direct, scores.direct, scores.inverse)
+
+    weight_vector = numpy.array([weights[factor] for factor in scores.factors], dtype=float)
+    budget = score @ weight_vector * total_budget
+
+    return budget, budget / scores.gdp * 100
+
+
+@instrumented('allocate_budget')
+def allocate_budget(total_budget: float, factor_proportionality: Dict[str, str], weights: Dict[str, float],
+                    year: str) -> Dict[str, Tuple[float, float]]:
+    """Calculates the budget and the budget percentage of every country with data
+    in the given year at once. Gives the same result as calling budget_details
+    for each country.
+
+    Preconditions:
+        - all(factor_proportionality[factor] == 'direct' or
+        factor_proportionality[factor] == 'inverse' factor in factor_proportionality)
+        - factor_proportionality.keys() == weights.keys()
+        - total_budget >= 1,000,000
+    """
+    scores = factor_scores(year, list(factor_proportionality))
+    budget, percentage = allocation_arrays(scores, total_budget, factor_proportionality, weights)
+
+    return {code: (float(budget[i]), float(percentage[i])) for i, code in enumerate(scores.codes)}
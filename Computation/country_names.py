@@ -0,0 +1,215 @@
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Mapping, Optional, TYPE_CHECKING
+import difflib
+import hashlib
+import re
+import unicodedata
+
+if TYPE_CHECKING:
+    import numpy
+
+# Names used by common datasets for countries that the country codes dataset names differently
+ALIASES = {
+    'Bolivia (Plurinational State of)': 'BOL',
+    'Brunei Darussalam': 'BRN',
+    'Burma': 'MMR',
+    'Cabo Verde': 'CPV',
+    'Chinese Taipei': 'TWN',
+    'Congo, Dem. Rep.': 'COD',
+    'Congo, Rep.': 'COG',
+    'Czechia': 'CZE',
+    'Democratic Republic of Congo': 'COD',
+    'Democratic Republic of the Congo': 'COD',
+    'Democratic Republic of Timor-Leste': 'TLS',
+    'DR Congo': 'COD',
+    'East Timor': 'TLS',
+    'Egypt, Arab Rep.': 'EGY',
+    'Eswatini': 'SWZ',
+    'Former Yugoslav Republic of Macedonia': 'MKD',
+    'Great Britain': 'GBR',
+    'Hong Kong SAR, China': 'HKG',
+    'Iran, Islamic Rep.': 'IRN',
+    'Ivory Coast': 'CIV',
+    'Korea, Dem. People\'s Rep.': 'PRK',
+    'Korea, Rep.': 'KOR',
+    'Kyrgyz Republic': 'KGZ',
+    'Lao PDR': 'LAO',
+    'Laos': 'LAO',
+    'Macao SAR, China': 'MAC',
+    'Micronesia, Fed. Sts.': 'FSM',
+    'North Macedonia': 'MKD',
+    'Republic of Congo': 'COG',
+    'Republic of Korea': 'KOR',
+    'Republic of Moldova': 'MDA',
+    'Republic of Yemen': 'YEM',
+    'Russian Federation': 'RUS',
+    'Slovak Republic': 'SVK',
+    'St. Martin (French part)': 'MAF',
+    'St. Vincent and the Grenadines': 'VCT',
+    'Swaziland': 'SWZ',
+    'Syrian Arab Republic': 'SYR',
+    'Tanzania, United Republic of': 'TZA',
+    'Turkiye': 'TUR',
+    'UK': 'GBR',
+    'United States of America': 'USA',
+    'US': 'USA',
+    'USA': 'USA',
+    'Venezuela, RB': 'VEN',
+    'Viet Nam': 'VNM',
+    'Virgin Islands (U.S.)': 'VIR',
+    'West Bank and Gaza': 'PSE',
+    'Yemen, Rep.': 'YEM',
+}
+
+# Words left out of normalized names
+IGNORED_WORDS = frozenset({'the', 'of'})
+
+# Words replaced by their full form in normalized names
+ABBREVIATIONS = {'st': 'saint', 'ste': 'sainte', 'is': 'islands', 'isl': 'islands', 'rep': 'republic',
+                 'dem': 'democratic', 'fed': 'federal', 'sts': 'states', '&': 'and'}
+
+# Lowest similarity, between 0 and 1, of a name to the closest normalized name for it to resolve to it
+FUZZY_CUTOFF = 0.88
+
+# Version of normalize_name, persisted indices of other versions are rebuilt
+NORMALIZATION_VERSION = 1
+
+
+def normalize_name(name: str) -> str:
+    """Return the name without case, accents, punctuation, ignored words and
+    abbreviations, with its words sorted so that 'Gambia, The' and 'The Gambia'
+    normalize to the same name.
+
+    >>> normalize_name("Côte d'Ivoire")
+    'cote divoire'
+    >>> normalize_name('Korea, Rep.')
+    'korea republic'
+    """
+    decomposed = unicodedata.normalize('NFKD', name)
+    unaccented = ''.join(character for character in decomposed if not unicodedata.combining(character))
+    words = re.sub(r"['’`]", '', unaccented.casefold()).replace('&', ' & ')
+    words = re.findall(r'\w+|&', words)
+
+    return ' '.join(sorted(ABBREVIATIONS.get(word, word) for word in words if word not in IGNORED_WORDS))
+
+
+def index_version() -> str:
+    """Return a short hash identifying ALIASES and the normalization of names, so
+    that a persisted index is rebuilt when either changes.
+    """
+    identity = repr((NORMALIZATION_VERSION, sorted(ABBREVIATIONS.items()), sorted(ALIASES.items())))
+    return hashlib.sha1(identity.encode()).hexdigest()[:12]
+
+
+@dataclass
+class NameResolution:
+    """The iso codes of a column of country names.
+
+    Instance Attributes:
+        - codes: the iso code of each name, or 'Not Found' if it could not be resolved
+        - approximate: the names only resolved by fuzzy matching, mapped to the name they matched
+        - unresolved: the distinct names that could not be resolved, in order of appearance
+    """
+    codes: List[str]
+    approximate: Dict[str, str] = field(default_factory=dict)
+    unresolved: List[str] = field(default_factory=list)
+
+
+@dataclass(frozen=True)
+class NameIndex:
+    """The country names that resolve to each iso code.
+
+    Instance Attributes:
+        - exact: the iso code of each name as written in the country codes dataset
+        - normalized: the iso code of each normalized name
+        - names: a name that normalizes to each normalized name, for reporting fuzzy matches
+    """
+    exact: Mapping[str, str]
+    normalized: Dict[str, str]
+    names: Dict[str, str]
+
+    def resolve(self, name: str, fuzzy: bool = True) -> Optional[str]:
+        """Return the iso code of the name, or None if it cannot be resolved"""
+        if name in self.exact:
+            return self.exact[name]
+
+        key = normalize_name(name)
+        if key not in self.normalized and fuzzy:
+            key = self.closest_name(key)
+
+        return self.normalized.get(key)
+
+    def closest_name(self, key: str) -> Optional[str]:
+        """Return the normalized name of the index most similar to key, or None if
+        none is at least FUZZY_CUTOFF similar to it.
+        """
+        matches = difflib.get_close_matches(key, self.normalized, n=1, cutoff=FUZZY_CUTOFF) if key else []
+        return matches[0] if matches else None
+
+    def resolve_names(self, names: Iterable[str], fuzzy: bool = True) -> NameResolution:
+        """Return the iso codes of the names, resolving each distinct name once"""
+        names = list(names)
+        resolution = NameResolution([])
+        code_of_name = {}
+
+        for name in dict.fromkeys(names):
+            code = self.resolve(name, fuzzy=False)
+            if code is None and fuzzy:
+                key = self.closest_name(normalize_name(name))
+                if key is not None:
+                    code = self.normalized[key]
+                    resolution.approximate[name] = self.names[key]
+
+            if code is None:
+                resolution.unresolved.append(name)
+                code = 'Not Found'
+            code_of_name[name] = code
+
+        resolution.codes = [code_of_name[name] for name in names]
+        return resolution
+
+    def to_arrays(self) -> Dict[str, 'numpy.ndarray']:
+        """Return the normalized names and their iso codes as arrays to persist"""
+        import numpy
+
+        keys = list(self.normalized)
+        return {'keys': numpy.array(keys, dtype=str),
+                'codes': numpy.array([self.normalized[key] for key in keys], dtype=str),
+                'names': numpy.array([self.names[key] for key in keys], dtype=str)}
+
+    @classmethod
+    def from_arrays(cls, exact: Mapping[str, str], arrays: Mapping[str, 'numpy.ndarray']) -> 'NameIndex':
+        """Return the index persisted with to_arrays, resolving exact names with exact"""
+        keys = arrays['keys'].tolist()
+        return cls(exact, dict(zip(keys, arrays['codes'].tolist())), dict(zip(keys, arrays['names'].tolist())))
+
+
+def build_name_index(exact: Mapping[str, str]) -> NameIndex:
+    """Return the index of the country names of exact, which maps names to iso
+    codes, and of ALIASES. Normalized names shared by countries with different
+    codes are left out unless an alias settles them.
+    """
+    normalized = {}
+    names = {}
+    ambiguous = set()
+
+    for name, code in exact.items():
+        key = normalize_name(name)
+        if len(code) != 3 or not key:
+            continue
+        elif key in normalized and normalized[key] != code:
+            ambiguous.add(key)
+        else:
+            normalized[key] = code
+            names.setdefault(key, name)
+
+    for key in ambiguous:
+        del normalized[key]
+        del names[key]
+
+    for name, code in ALIASES.items():
+        key = normalize_name(name)
+        normalized[key] = code
+        names[key] = name
+
+    return NameIndex(exact, normalized, names)
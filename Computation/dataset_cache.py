@@ -0,0 +1,105 @@
+from typing import Dict, Optional, TYPE_CHECKING
+from path import GLOBAL_PROJECT_PATH
+from Computation.instrumentation import count, instrumented
+import hashlib
+import os
+import tempfile
+import warnings
+
+if TYPE_CHECKING:
+    import numpy
+
+CACHE_DIRECTORY = os.path.join(GLOBAL_PROJECT_PATH, 'Computation/Compiled Datasets')
+
+# Version of the layout of the compiled arrays, compiled tables of other versions are ignored
+CACHE_FORMAT = 4
+
+
+def _content_hash(file_name: str) -> str:
+    """Return the sha256 hex digest of the contents of the file"""
+    digest = hashlib.sha256()
+
+    with open(file_name, 'rb') as source:
+        for block in iter(lambda: source.read(1 << 20), b''):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+
+def _cache_path(file_name: str, independent_column: str, back_up_independent_column: str) -> str:
+    """Return the path of the compiled version of the csv file read with the given
+    independent columns.
+    """
+    table_key = '\0'.join([os.path.abspath(file_name), independent_column, back_up_independent_column])
+    name = os.path.basename(file_name).split('.')[0] + ' ' + hashlib.sha1(table_key.encode()).hexdigest()[:12]
+
+    return os.path.join(CACHE_DIRECTORY, name + '.npz')
+
+
+@instrumented('load_compiled_table')
+def load_table(file_name: str, independent_column: str,
+               back_up_independent_column: str) -> Optional[Dict[str, 'numpy.ndarray']]:
+    """Return the arrays compiled from the csv file, or None if it has not been compiled
+    or the csv file has changed since it was compiled.
+
+    The csv file is considered unchanged if its modification time and size are the
+    ones recorded, or otherwise if its contents hash to the recorded value.
+    """
+    import numpy
+
+    cache_path = _cache_path(file_name, independent_column, back_up_independent_column)
+
+    try:
+        with numpy.load(cache_path, allow_pickle=False) as compiled:
+            arrays = {name: compiled[name] for name in compiled.files}
+        count('load_compiled_table', bytes_read=os.path.getsize(cache_path))
+        source_stat = os.stat(file_name)
+        recorded_format = int(arrays.pop('format'))
+        recorded_mtime, recorded_size = arrays.pop('signature').tolist()
+        recorded_hash = str(arrays.pop('content_hash'))
+    except (OSError, ValueError, KeyError):
+        return None
+
+    if recorded_format != CACHE_FORMAT or recorded_size != source_stat.st_size:
+        return None
+    elif recorded_mtime == source_stat.st_mtime_ns:
+        return arrays
+    elif recorded_hash != _content_hash(file_name):
+        return None
+    else:
+        store_table(file_name, independent_column, back_up_independent_column, arrays)
+        return arrays
+
+
+def store_table(file_name: str, independent_column: str, back_up_independent_column: str,
+                arrays: Dict[str, 'numpy.ndarray']) -> None:
+    """Compile the arrays read from the csv file to disk, so that they can be loaded
+    by load_table in later runs. The names format, signature and content_hash are
+    reserved.
+    """
+    import numpy
+
+    cache_path = _cache_path(file_name, independent_column, back_up_independent_column)
+    arrays = dict(arrays)
+    arrays['format'] = numpy.array(CACHE_FORMAT)
+
+    try:
+        source_stat = os.stat(file_name)
+        arrays['signature'] = numpy.array([source_stat.st_mtime_ns, source_stat.st_size], dtype=numpy.int64)
+        arrays['content_hash'] = numpy.array(_content_hash(file_name))
+
+        os.makedirs(CACHE_DIRECTORY, exist_ok=True)
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=CACHE_DIRECTORY, suffix='.npz')
+        with os.fdopen(file_descriptor, 'wb') as temporary_file:
+            numpy.savez(temporary_file, **arrays)
+        os.replace(temporary_path, cache_path)
+    except OSError:
+        warnings.warn('Unable to compile ' + file_name, RuntimeWarning)
+
+
+def clear_compiled_tables() -> None:
+    """Remove every compiled table from disk"""
+    if os.path.isdir(CACHE_DIRECTORY):
+        for name in os.listdir(CACHE_DIRECTORY):
+            if name.endswith('.npz'):
+                os.remove(os.path.join(CACHE_DIRECTORY, name))
@@ -1,67 +1,669 @@
-from typing import Dict, Optional, List
+from typing import Callable, Dict, Iterable, Iterator, Optional, List, Mapping, Sequence, TextIO, Tuple, TYPE_CHECKING
 import csv
+from collections import OrderedDict
+from collections.abc import Mapping as MappingBase
+from concurrent.futures import Future
 from dataclasses import dataclass
 from datetime import datetime
+from types import MappingProxyType
 from path import GLOBAL_PROJECT_PATH
+from Computation.dataset_cache import load_table, store_table
+from Computation.instrumentation import count, instrumented
+from Computation.country_names import NameIndex, NameResolution, build_name_index, index_version
+import gzip
+import hashlib
+import io
+import threading
 import warnings
 import os
 
+if TYPE_CHECKING:
+    import numpy
+
+# Directory holding the Constant Datasets and Responsibility Datasets directories
+RAW_DATASETS_PATH = os.path.join(GLOBAL_PROJECT_PATH, 'Computation/Raw Datasets')
+
+
+def _read_only_column(values: 'numpy.ndarray') -> 'numpy.ndarray':
+    """Return a read only float64 copy of the values"""
+    import numpy
+
+    column = numpy.array(values, dtype=float)
+    column.flags.writeable = False
+
+    return column
+
+
+class CountryStore(MappingBase):
+    """Class for maintaining the countries of a year column by column, mapping
+    the iso code of each country to a Country view of its row. A store is built
+    once from finished columns and is read only, so that it can be shared by every
+    user of a cached YearDataset.
+
+    Instance Attributes:
+        - codes: the iso code of the country in each row
+        - names: the name of the country in each row
+        - gdp: the read only float64 array of the gdp of the country in each row
+        - factors: the read only float64 array of data of each factor, with a value for every row
+    """
+    __slots__ = ('codes', 'names', 'gdp', 'factors', '_row_of_code')
+    codes: Tuple[str, ...]
+    names: Tuple[str, ...]
+    gdp: 'numpy.ndarray'
+    factors: Mapping[str, 'numpy.ndarray']
+    _row_of_code: Dict[str, int]
+
+    def __init__(self, codes: Sequence[str], names: Sequence[str], gdp: 'numpy.ndarray',
+                 factor_columns: Dict[str, 'numpy.ndarray']) -> None:
+        """Initialize a store of the countries in the rows of the columns, copying them
+
+        Precondition:
+            - codes has no duplicates
+            - len(names) == len(gdp) == len(codes)
+            - all(len(factor_columns[factor]) == len(codes) for factor in factor_columns)
+        """
+        self.codes = tuple(codes)
+        self.names = tuple(names)
+        self.gdp = _read_only_column(gdp)
+        self.factors = MappingProxyType({factor: _read_only_column(factor_columns[factor])
+                                         for factor in factor_columns})
+        self._row_of_code = {code: i for i, code in enumerate(self.codes)}
+
+    def row(self, code: str) -> int:
+        """Return the row of the country with the iso code"""
+        return self._row_of_code[code]
+
+    def __getitem__(self, code: str) -> 'Country':
+        return Country(self, self._row_of_code[code])
+
+    def __contains__(self, code: object) -> bool:
+        return code in self._row_of_code
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.codes)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+
+class _CountryFactors(MappingBase):
+    """The data of every factor for a row of a CountryStore"""
+    __slots__ = ('_store', '_row')
+
+    def __init__(self, store: CountryStore, row: int) -> None:
+        self._store = store
+        self._row = row
+
+    def __getitem__(self, factor: str) -> float:
+        return float(self._store.factors[factor][self._row])
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._store.factors)
+
+    def __len__(self) -> int:
+        return len(self._store.factors)
+
 
-@dataclass
 class Country:
-    """Class for maintaining information about each country"""
-    name: str
-    gdp: float
-    factors: dict
+    """Class for maintaining information about each country, as a view of its
+    row in a CountryStore"""
+    __slots__ = ('_store', '_row')
+
+    def __init__(self, store: CountryStore, row: int) -> None:
+        self._store = store
+        self._row = row
+
+    @property
+    def name(self) -> str:
+        """The name of the country"""
+        return self._store.names[self._row]
+
+    @property
+    def gdp(self) -> float:
+        """The gdp of the country"""
+        return float(self._store.gdp[self._row])
+
+    @property
+    def factors(self) -> Mapping[str, float]:
+        """The data of every factor for the country"""
+        return _CountryFactors(self._store, self._row)
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, Country) and (self.name, self.gdp, dict(self.factors)) == \
+            (other.name, other.gdp, dict(other.factors))
+
+    def __repr__(self) -> str:
+        return f'Country(name={self.name!r}, gdp={self.gdp!r}, factors={dict(self.factors)!r})'
+
+
+@dataclass(frozen=True)
+class FactorStatistics:
+    """Class for maintaining the aggregates of a factor that are
+    shared by the calculation of every country"""
+    total: float
+    inverse_denominator: float
+
+
+@dataclass(frozen=True)
+class YearDataset:
+    """Class for maintaining the read only datasets of a year, as given by
+    map_iso_to_country and get_clean_datasets, along with the statistics of
+    each factor of the clean dataset."""
+    year: str
+    countries: CountryStore
+    clean: Mapping[str, Mapping[str, float]]
+    factor_statistics: Mapping[str, FactorStatistics]
+
+
+@dataclass(frozen=True)
+class DatasetTable:
+    """Class for maintaining every column of a csv dataset, with a row for
+    each key of its independent column.
+
+    Instance Attributes:
+        - keys: the key of each row
+        - columns: the header of the csv file
+        - values: columns x rows array of the number in each cell, NaN where it is
+        missing or the column is not numeric
+        - valid: columns x rows mask of the cells holding a number
+        - text: the cell of each row for every column that is not numeric
+        - row_of_key: the row of each key
+        - column_index: the position of each column in the header
+    """
+    keys: List[str]
+    columns: List[str]
+    values: 'numpy.ndarray'
+    valid: 'numpy.ndarray'
+    text: Dict[str, List[str]]
+    row_of_key: Dict[str, int]
+    column_index: Dict[str, int]
+
+    def column_mapping(self, column: str) -> Dict[str, object]:
+        """Return a mapping of the key of each row to the cell of the column, a float
+        (NaN where missing) for numeric columns and a string for the others.
+        """
+        if column in self.text:
+            return dict(zip(self.keys, self.text[column]))
+
+        return dict(zip(self.keys, self.values[self.column_index[column]].tolist()))
+
+
+# Extensions of the dataset files that can be read: parquet files and csv files, compressed or not. When files
+# of a dataset exist with several of them, the file with the earliest extension is read, so that a parquet file
+# stands in for the csv file it was converted from
+DATASET_EXTENSIONS = ('.parquet', '.csv', '.csv.gz', '.csv.zst')
+
+
+def dataset_name(file_name: str) -> str:
+    """Return the name of the dataset in the file, without its directory and extension
+
+    Precondition:
+        - file_name.endswith(DATASET_EXTENSIONS)
+    """
+    base_name = os.path.basename(file_name)
+
+    return next(base_name[:-len(extension)] for extension in DATASET_EXTENSIONS[::-1]
+                if base_name.endswith(extension))
+
+
+def open_dataset(file_name: str) -> TextIO:
+    """Open the csv file for reading utf-8 text, skipping any byte order mark and
+    decompressing it on the fly if it is compressed with gzip (.gz) or zstandard
+    (.zst). Reading zstandard files requires the zstandard package.
+    """
+    if file_name.endswith('.gz'):
+        return gzip.open(file_name, 'rt', encoding='utf-8-sig', newline='')
+    elif file_name.endswith('.zst'):
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError('The zstandard package is needed to read ' + file_name)
+        return io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(open(file_name, 'rb'), closefd=True),
+                                encoding='utf-8-sig', newline='')
+    else:
+        return open(file_name, encoding='utf-8-sig', newline='')
+
+
+def _make_table(keys: List[str], columns: List[str], values: 'numpy.ndarray',
+                text: Dict[str, List[str]]) -> DatasetTable:
+    """Return the table of the rows and columns, computing its mask and indexes"""
+    import numpy
+
+    return DatasetTable(keys, columns, values, ~numpy.isnan(values), text,
+                        {key: i for i, key in enumerate(keys)},
+                        {column: j for j, column in enumerate(columns)})
+
+
+def _first_positions_last_rows(keys: List[str]) -> Tuple[List[str], List[int]]:
+    """Return each distinct key in the order of its first occurrence, and the position
+    of its last occurrence, as a dictionary being filled with the keys would hold them.
+    """
+    last_row = {}
+
+    for i, key in enumerate(keys):
+        last_row[key] = i
+
+    return list(last_row), list(last_row.values())
+
+
+def _read_header(file_name: str) -> List[str]:
+    """Return the header of the csv file"""
+    with open_dataset(file_name) as csvfile:
+        return next(csv.reader(csvfile))
+
+
+def _csv_columns(file_name: str, width: int) -> List[Sequence[str]]:
+    """Return the cells of each of the first width columns of the csv file below its
+    header, read with the csv module. Short rows are padded with empty cells.
+    """
+    with open_dataset(file_name) as csvfile:
+        reader = csv.reader(csvfile)
+        next(reader)
+        rows = [row[:width] if len(row) >= width else row + [''] * (width - len(row)) for row in reader]
+
+    return list(zip(*rows)) if rows else [()] * width
+
+
+def _pandas_columns(file_name: str, width: int) -> List[Sequence[str]]:
+    """Return the columns given by _csv_columns, read with the C parser of pandas"""
+    import pandas
+
+    frame = pandas.read_csv(file_name, header=None, skiprows=1, names=range(width), usecols=range(width),
+                            dtype=str, keep_default_na=False, na_filter=False, skip_blank_lines=False,
+                            encoding='utf-8-sig')
+
+    return [frame[j].to_numpy() for j in range(width)]
+
+
+def _pyarrow_columns(file_name: str, width: int) -> List[Sequence[str]]:
+    """Return the columns given by _csv_columns, read with the csv reader of pyarrow.
+    Raises ValueError for rows that do not have exactly width cells.
+    """
+    import pyarrow
+    import pyarrow.csv
+
+    names = ['f' + str(j) for j in range(width)]
+    table = pyarrow.csv.read_csv(
+        file_name,
+        read_options=pyarrow.csv.ReadOptions(column_names=names, skip_rows=1),
+        parse_options=pyarrow.csv.ParseOptions(ignore_empty_lines=False),
+        convert_options=pyarrow.csv.ConvertOptions(column_types={name: pyarrow.string() for name in names},
+                                                   strings_can_be_null=False, quoted_strings_can_be_null=False))
+
+    return [table.column(j).to_numpy(zero_copy_only=False) for j in range(width)]
+
+
+def _numpy_floats(cells: Sequence[str]) -> 'numpy.ndarray':
+    """Return the cells as floats, with NaN for empty cells. Raises ValueError if
+    a cell is not a number.
+    """
+    import numpy
+
+    strings = numpy.asarray(cells, dtype=str)
+    return numpy.where(strings == '', 'nan', strings).astype(float)
+
+
+def _pyarrow_floats(cells: Sequence[str]) -> 'numpy.ndarray':
+    """Return _numpy_floats(cells), parsing the cells with pyarrow when it accepts
+    all of them, which it does for every number it can parse the same way.
+    """
+    import pyarrow
+    import pyarrow.compute
+
+    strings = pyarrow.array(cells, type=pyarrow.string())
+    try:
+        floats = pyarrow.compute.cast(pyarrow.compute.if_else(pyarrow.compute.equal(strings, ''), None, strings),
+                                      pyarrow.float64())
+    except pyarrow.ArrowInvalid:
+        return _numpy_floats(cells)
+
+    return floats.to_numpy(zero_copy_only=False)
+
+
+@dataclass(frozen=True)
+class ParserBackend:
+    """A way of reading the columns of csv files and converting them to floats,
+    with the same results as the csv module and numpy.
+
+    Instance Attributes:
+        - read_columns: returns the cells of the first width columns of a file below its header
+        - to_floats: returns the cells of a column as floats, raising ValueError if one is not a number
+    """
+    read_columns: Callable[[str, int], List[Sequence[str]]]
+    to_floats: Callable[[Sequence[str]], 'numpy.ndarray']
+
+
+# Parser used to read csv files, one of PARSER_BACKENDS or 'auto' for the first one installed
+PARSER_BACKEND = 'auto'
+PARSER_BACKENDS = {'pyarrow': ParserBackend(_pyarrow_columns, _pyarrow_floats),
+                   'pandas': ParserBackend(_pandas_columns, _numpy_floats),
+                   'csv': ParserBackend(_csv_columns, _numpy_floats)}
+
+
+def _read_columns(file_name: str, width: int) -> Tuple[List[Sequence[str]], ParserBackend]:
+    """Return the columns given by _csv_columns, read with PARSER_BACKEND, and the
+    backend that read them. Falls back to the next backend if it is not installed
+    or cannot parse the file, and finally to the csv module.
+    """
+    if PARSER_BACKEND == 'auto':
+        backends = [PARSER_BACKENDS[name] for name in PARSER_BACKENDS]
+    else:
+        backends = [PARSER_BACKENDS[PARSER_BACKEND], PARSER_BACKENDS['csv']]
+
+    for backend in backends[:-1]:
+        try:
+            return backend.read_columns(file_name, width), backend
+        except (ImportError, ValueError):
+            continue
+
+    return backends[-1].read_columns(file_name, width), backends[-1]
+
+
+def _warn_resolution(resolution: NameResolution, file_name: str) -> None:
+    """Warn about the country names of the file that were matched approximately or
+    could not be matched, and whose rows are therefore left out.
+    """
+    if resolution.approximate:
+        matches = ', '.join(name + ' as ' + match for name, match in resolution.approximate.items())
+        warnings.warn('Approximately matched country names of ' + file_name + ': ' + matches, RuntimeWarning)
+    if resolution.unresolved:
+        warnings.warn('Unable to find the iso codes of ' + ', '.join(resolution.unresolved)
+                      + ' in ' + file_name + ', leaving them out', RuntimeWarning)
+
+
+def _parquet_columns(file_name: str) -> Tuple[List[str], List[Sequence]]:
+    """Return the header of the parquet file and the cells of each of its columns,
+    as floats for numeric columns, with NaN for missing values, and as strings for
+    other columns, with empty strings for missing values.
+    """
+    import pyarrow
+    import pyarrow.compute
+    import pyarrow.parquet
+
+    table = pyarrow.parquet.read_table(file_name)
+    columns = []
+
+    for column in table.columns:
+        if pyarrow.types.is_integer(column.type) or pyarrow.types.is_floating(column.type):
+            columns.append(column.cast(pyarrow.float64()).to_numpy())
+        else:
+            strings = column if pyarrow.types.is_string(column.type) else column.cast(pyarrow.string())
+            columns.append(pyarrow.compute.fill_null(strings, '').to_numpy(zero_copy_only=False))
+
+    return table.column_names, columns
+
+
+def _parquet_floats(cells: Sequence) -> 'numpy.ndarray':
+    """Return the cells of a column given by _parquet_columns as floats. Raises
+    ValueError if a cell of a string column is not a number.
+    """
+    import numpy
+
+    if isinstance(cells, numpy.ndarray) and cells.dtype.kind == 'f':
+        return cells
+
+    return _numpy_floats(cells)
+
+
+@instrumented('parse_dataset')
+def _read_all_columns(file_name: str, independent_column: str,
+                      back_up_independent_column: str) -> DatasetTable:
+    """Return a table of every column of the csv or parquet file, with a row for each
+    key of the independent column, reading the file only once. Numeric columns are
+    converted to floats column by column.
+
+    Precondition:
+        - filepath refers to a csv or parquet file with 2 or more columns
+        - independent_column or back_up_independent_column is present in the header
+    """
+    import numpy
+
+    if file_name.endswith('.parquet'):
+        header, columns = _parquet_columns(file_name)
+        to_floats = _parquet_floats
+    else:
+        header = _read_header(file_name)
+        columns, backend = _read_columns(file_name, len(header))
+        to_floats = backend.to_floats
+
+    width = len(header)
+    count('parse_dataset', rows=len(columns[0]) if columns else 0, bytes_read=os.path.getsize(file_name))
+
+    if independent_column in header:
+        req_i = len(header) - 1 - header[::-1].index(independent_column)
+        row_keys = [str(key) for key in columns[req_i]]
+    else:
+        req_i = len(header) - 1 - header[::-1].index(back_up_independent_column)
+        resolution = resolve_country_names(str(name) for name in columns[req_i])
+        row_keys = resolution.codes
+        _warn_resolution(resolution, file_name)
+
+    found = [i for i in range(len(row_keys)) if row_keys[i] != 'Not Found']
+    keys, last_rows = _first_positions_last_rows([row_keys[i] for i in found])
+    selected = numpy.array([found[i] for i in last_rows], dtype=numpy.intp)
+
+    values = numpy.full((width, len(keys)), numpy.nan)
+    text = {}
+
+    for j in range(width):
+        cells = numpy.asarray(columns[j])[selected]
+        try:
+            values[j] = to_floats(cells)
+        except ValueError:
+            text[header[j]] = [str(cell) for cell in cells]
+
+    return _make_table(keys, header, values, text)
+
+
+def _table_to_arrays(table: DatasetTable) -> Dict[str, 'numpy.ndarray']:
+    """Return the arrays compiled to disk for the table"""
+    import numpy
+
+    arrays = {'keys': numpy.array(table.keys, dtype=str), 'columns': numpy.array(table.columns, dtype=str),
+              'values': table.values, 'text_columns': numpy.array(list(table.text), dtype=str)}
+    for i, column in enumerate(table.text):
+        arrays['text ' + str(i)] = numpy.array(table.text[column], dtype=str)
+
+    return arrays
+
+
+def _arrays_to_table(arrays: Dict[str, 'numpy.ndarray']) -> DatasetTable:
+    """Return the table compiled to disk as the arrays"""
+    text_columns = arrays['text_columns'].tolist()
+    text = {column: arrays['text ' + str(i)].tolist() for i, column in enumerate(text_columns)}
+
+    return _make_table(arrays['keys'].tolist(), arrays['columns'].tolist(), arrays['values'], text)
+
+
+YEAR_INDEXED_TABLES = {}
+
+# Name of the compiled array recording how the country names of a table keyed by resolved names were resolved
+NAME_RESOLUTION_ARRAY = 'name_resolution'
+
+
+def _name_resolution_signature() -> str:
+    """Identifies the rules resolving country names and the version of the country
+    codes dataset they resolve names with, so that tables keyed by resolved names
+    are parsed again once either changes.
+    """
+    source_stat = os.stat(_country_codes_path())
+
+    return ' '.join([index_version(), str(source_stat.st_mtime_ns), str(source_stat.st_size)])
+
+
+@instrumented('year_indexed_table')
+def _year_indexed_table(file_name: str, independent_column: str,
+                        back_up_independent_column: str) -> DatasetTable:
+    """Return the table of all columns of the csv file, as given by _read_all_columns.
+    Each file is only read the first time it is asked for, and is only parsed
+    if its compiled version on disk is missing or out of date. A table keyed by
+    country names resolved to iso codes is also out of date once the
+    _name_resolution_signature changes.
+    """
+    import numpy
+
+    table_key = (file_name, independent_column, back_up_independent_column)
+
+    if table_key not in YEAR_INDEXED_TABLES:
+        arrays = load_table(file_name, independent_column, back_up_independent_column)
+        if arrays is not None and NAME_RESOLUTION_ARRAY in arrays \
+                and str(arrays[NAME_RESOLUTION_ARRAY]) != _name_resolution_signature():
+            arrays = None
+
+        if arrays is not None:
+            table = _arrays_to_table(arrays)
+        else:
+            table = _read_all_columns(file_name, independent_column, back_up_independent_column)
+            arrays = _table_to_arrays(table)
+            if independent_column not in table.column_index:
+                arrays[NAME_RESOLUTION_ARRAY] = numpy.array(_name_resolution_signature())
+            store_table(file_name, independent_column, back_up_independent_column, arrays)
+
+        YEAR_INDEXED_TABLES[table_key] = table
+
+    return YEAR_INDEXED_TABLES[table_key]
+
+
+def _column_position(table: DatasetTable, column: str, file_name: str) -> int:
+    """Return the position of the column in the table read from the file
+
+    Raises IndexError if the column is not in the table.
+    """
+    if column not in table.column_index:
+        raise IndexError(column + ' is not a column of ' + file_name)
+
+    return table.column_index[column]
 
 
 def _extract_wanted_column(file_name: str, dependant_column: str, independent_column='Country Code',
-                           back_up_independent_column='Country Name') -> Dict[str, str]:
+                           back_up_independent_column='Country Name') -> Dict[str, float]:
     """Return two lists which contain the essential columns from the input csv files for further processing.
+    Numbers are given as floats, with NaN where they are missing.
 
     Precondition:
         - filepath refers to a csv file with 2 or more columns
         - first and second column strings are present in the csv header
     """
-    mapping_of_relevant_columns = {}
+    table = _year_indexed_table(file_name, independent_column, back_up_independent_column)
+    _column_position(table, dependant_column, file_name)
 
-    with open(file_name) as csvfile:
-        reader = csv.reader(csvfile)
-        header = next(reader)
+    return table.column_mapping(dependant_column)
 
-        req_i = req_j = back_up_req_i = -999
 
-        for i in range(len(header)):
-            if header[i] == independent_column:
-                req_i = i
-            elif header[i] == dependant_column:
-                req_j = i
-            elif header[i] == back_up_independent_column:
-                back_up_req_i = i
+def _extension_rank(file_name: str) -> int:
+    """Return the position in DATASET_EXTENSIONS of the extension of the file
 
-        for row in reader:
-            if req_i != -999:
-                if row[req_j] != '':
-                    mapping_of_relevant_columns[row[req_i]] = row[req_j]
-                else:
-                    mapping_of_relevant_columns[row[req_i]] = -999
+    Precondition:
+        - file_name.endswith(DATASET_EXTENSIONS)
+    """
+    return next(i for i, extension in enumerate(DATASET_EXTENSIONS) if file_name.endswith(extension))
 
-            else:
-                row[back_up_req_i] = _name_to_iso(row[back_up_req_i])
-                if row[req_j] != '':
-                    mapping_of_relevant_columns[row[back_up_req_i]] = row[req_j]
-                else:
-                    mapping_of_relevant_columns[row[back_up_req_i]] = -999
 
-    if 'Not Found' in mapping_of_relevant_columns:
-        mapping_of_relevant_columns.pop('Not Found')
+def _responsibility_dataset_paths() -> Dict[str, str]:
+    """Provides a mapping of the name of each responsibility dataset to its path,
+    the path with the earliest of DATASET_EXTENSIONS if the dataset has several files.
+    """
+    target_path = os.path.join(RAW_DATASETS_PATH, 'Responsibility Datasets')
+    paths = {}
+
+    for name in os.listdir(target_path):
+        if name.endswith(DATASET_EXTENSIONS):
+            dataset = dataset_name(name)
+            if dataset not in paths or _extension_rank(name) < _extension_rank(paths[dataset]):
+                paths[dataset] = os.path.join(target_path, name)
+
+    return paths
+
+
+def _constant_dataset_path(name: str) -> str:
+    """Provides the path of the constant dataset of the name, in the first of
+    DATASET_EXTENSIONS it is found in, or as a csv file if it is not found.
+    """
+    base_path = os.path.join(RAW_DATASETS_PATH, 'Constant Datasets', name)
+
+    return next((base_path + extension for extension in DATASET_EXTENSIONS if os.path.exists(base_path + extension)),
+                base_path + '.csv')
+
+
+def _gdp_path() -> str:
+    """Provides the path of the gdp constant dataset"""
+    return _constant_dataset_path('GDP')
+
+
+def dataset_version() -> str:
+    """Provides a hash identifying the current version of the raw datasets, from the
+    size and modification time of each of them and the rules resolving country
+    names, so that results computed from other versions can be told apart.
+    """
+    digest = hashlib.sha1(index_version().encode())
+
+    for path in sorted([*_responsibility_dataset_paths().values(), _gdp_path(), _country_codes_path()]):
+        source_stat = os.stat(path)
+        digest.update('\0'.join([path, str(source_stat.st_size), str(source_stat.st_mtime_ns), '']).encode())
+
+    return digest.hexdigest()[:16]
+
+
+def _country_codes_path() -> str:
+    """Provides the path of the country codes constant dataset"""
+    return _constant_dataset_path('countries_codes_and_coordinates')
+
+
+def _country_code_table() -> Dict[str, str]:
+    """Provides the mapping of country names to iso codes, reading it the
+    first time it is needed.
+    """
+    global _COUNTRY_CODE_TABLE
+
+    table = _year_indexed_table(_country_codes_path(), 'Country', '')
+    if _COUNTRY_CODE_TABLE is None or _COUNTRY_CODE_TABLE[0] is not table:
+        _COUNTRY_CODE_TABLE = (table, table.column_mapping('Alpha-3 code'))
+
+    return _COUNTRY_CODE_TABLE[1]
 
-    return mapping_of_relevant_columns
 
+# The country codes table and the mapping of names to iso codes read from it
+_COUNTRY_CODE_TABLE = None
 
-COUNTRY_CODE_TABLE = _extract_wanted_column(os.path.join(GLOBAL_PROJECT_PATH,
-                                                         'Computation/Raw Datasets/Constant Datasets/countries_codes_and_coordinates.csv'),
-                                            'Alpha-3 code', independent_column='Country', back_up_independent_column='')
+
+def __getattr__(name: str) -> Dict[str, str]:
+    """Provides COUNTRY_CODE_TABLE without reading it at import time"""
+    if name == 'COUNTRY_CODE_TABLE':
+        return dict(_country_code_table())
+    raise AttributeError('module ' + __name__ + ' has no attribute ' + name)
+
+
+def _name_index() -> NameIndex:
+    """Provides the index of normalized country names, loading it from disk or
+    building it from the country codes dataset the first time it is needed.
+    """
+    global _NAME_INDEX
+
+    exact = _country_code_table()
+    if _NAME_INDEX is None or _NAME_INDEX.exact is not exact:
+        version = index_version()
+        arrays = load_table(_country_codes_path(), NAME_INDEX_COLUMN, version)
+        if arrays is None:
+            _NAME_INDEX = build_name_index(exact)
+            store_table(_country_codes_path(), NAME_INDEX_COLUMN, version, _NAME_INDEX.to_arrays())
+        else:
+            _NAME_INDEX = NameIndex.from_arrays(exact, arrays)
+
+    return _NAME_INDEX
+
+
+# Key the index of normalized country names is persisted under, and the index itself
+NAME_INDEX_COLUMN = 'Normalized Country Names'
+_NAME_INDEX = None
+
+
+def resolve_country_names(names: Iterable[str], fuzzy: bool = True) -> NameResolution:
+    """Return the iso codes of a column of country names, matching names that differ
+    from the country codes dataset in case, accents, punctuation or word order, or
+    that are common aliases, and the closest name if fuzzy and nothing else matches.
+    The result reports the names that were matched approximately or not at all.
+    """
+    return _name_index().resolve_names(names, fuzzy)
 
 
 def _name_to_iso(name_target: str) -> str:
@@ -70,14 +672,14 @@ def _name_to_iso(name_target: str) -> str:
     Precondition:
         - Name entered is valid
     """
-    if name_target in COUNTRY_CODE_TABLE:
-        return COUNTRY_CODE_TABLE[name_target]
-    else:
-        return 'Not Found'
+    code = _name_index().resolve(name_target)
+    return 'Not Found' if code is None else code
 
 
-def get_raw_datasets(year: str) -> Optional[Dict[str, Dict[str, str]]]:
-    """Provide a raw version of the datasets used for computation
+@instrumented('get_raw_datasets')
+def get_raw_datasets(year: str) -> Optional[Dict[str, Dict[str, float]]]:
+    """Provide a raw version of the datasets used for computation, with NaN
+    where data is missing
 
     Precondition:
         - At least one csv file in the Constant Computation directory
@@ -85,72 +687,105 @@ def get_raw_datasets(year: str) -> Optional[Dict[str, Dict[str, str]]]:
         - All csv files have a column of either 'Country Name' or 'Country Code'
         as well as a column of the input year
     """
-    target_path = os.path.join(GLOBAL_PROJECT_PATH, 'Computation/Raw Datasets/Responsibility Datasets/')
-    files = os.listdir(target_path)
+    dataset_paths = _responsibility_dataset_paths()
     data_dict = {}
 
-    for name in files:
-        data_dict[name[:-4]] = _extract_wanted_column(os.path.join(target_path, name), year, 'Country Code',
-                                                      'Country Name')
+    for name in dataset_paths:
+        data_dict[name] = _extract_wanted_column(dataset_paths[name], year, 'Country Code', 'Country Name')
 
     return data_dict
 
 
-def map_iso_to_country(year: str) -> Dict[str, Country]:
-    """Provides a dictionary mapping the ISO codes to the corresponding country
-    dataclass. The dataclass provided has no budget of 0 when initialized.
+def _responsibility_tables() -> Dict[str, DatasetTable]:
+    """Provides the table of each responsibility dataset"""
+    dataset_paths = _responsibility_dataset_paths()
 
-    Precondition:
-        - All csv files have a column of either 'Country Name' or 'Country Code'
-        as well as a column of the input year
+    return {name: _year_indexed_table(dataset_paths[name], 'Country Code', 'Country Name')
+            for name in dataset_paths}
+
+
+def _columns_of_codes(table: DatasetTable, columns: List[str], codes: List[str],
+                      file_name: str) -> 'numpy.ndarray':
+    """Return a columns x codes array of the number in each column for each of the
+    iso codes, NaN where the code is not in the table or the number is missing.
     """
+    import numpy
 
-    code_to_country = {}
-    responsibility_datasets = get_raw_datasets(year)
+    positions = [_column_position(table, column, file_name) for column in columns]
+    rows = numpy.array([table.row_of_key.get(code, -1) for code in codes], dtype=numpy.intp)
+    found = rows >= 0
 
-    country_gdp_table = _extract_wanted_column(os.path.join(GLOBAL_PROJECT_PATH,
-                                                            'Computation/Raw Datasets/Constant Datasets/GDP.csv'),
-                                               year)
+    if not table.keys:
+        return numpy.full((len(columns), len(codes)), numpy.nan)
 
-    for country in COUNTRY_CODE_TABLE:
-        country_data_map = {}
-        country_iso = COUNTRY_CODE_TABLE[country]
+    values = table.values[positions][:, numpy.where(found, rows, 0)]
+    return numpy.where(found, values, numpy.nan)
 
-        try:
-            for dataset in responsibility_datasets:
-                corresponding_data = responsibility_datasets[dataset]
-                country_data_map[dataset] = float(corresponding_data[country_iso])
 
-            no_information = any(country_data_map[dataset] == -999 for dataset in country_data_map)
+def _country_columns(years: List[str]) -> Tuple[List[str], List[str], 'numpy.ndarray',
+                                                Dict[str, 'numpy.ndarray'], 'numpy.ndarray']:
+    """Provides the name and iso code of every country in the country codes table,
+    years x countries arrays of their gdp and data of each responsibility dataset
+    in each of the years, and a years x countries mask of the countries with all of
+    this information available.
+    """
+    import numpy
 
-            if not no_information:
-                code_to_country[country_iso] = Country(country, float(country_gdp_table[country_iso]), country_data_map)
-            else:
-                warnings.warn('Unavailable data for ' + country + ' in ' + year, RuntimeWarning)
+    country_codes = _year_indexed_table(_country_codes_path(), 'Country', '')
+    names = country_codes.keys
+    codes = list(_country_code_table().values())
 
-        except KeyError:
-            warnings.warn('Unavailable data for ' + country + ' in ' + year, RuntimeWarning)
+    gdp = _columns_of_codes(_year_indexed_table(_gdp_path(), 'Country Code', 'Country Name'), years, codes,
+                            _gdp_path())
+    dataset_paths = _responsibility_dataset_paths()
+    tables = _responsibility_tables()
+    factor_columns = {name: _columns_of_codes(tables[name], years, codes, dataset_paths[name])
+                      for name in tables}
 
-    return code_to_country
+    available = ~numpy.isnan(gdp)
+    for name in factor_columns:
+        available &= ~numpy.isnan(factor_columns[name])
 
+    return names, codes, gdp, factor_columns, available
 
-def get_clean_datasets(year: str) -> Dict[str, Dict[str, str]]:
-    """Provide a final revised dataset for performing computations"""
-    raw_data_map = get_raw_datasets(year)
-    clean_data_map = {}
-    mapped_iso_to_country = map_iso_to_country(year)
 
-    for data_key in raw_data_map:
-        each_data_map = {}
-        for country in raw_data_map[data_key]:
-            if country in mapped_iso_to_country:
-                each_data_map[country] = mapped_iso_to_country[country].factors[data_key]
+@instrumented('map_iso_to_country')
+def map_iso_to_country(year: str) -> CountryStore:
+    """Provides a mapping of the ISO codes to the corresponding country,
+    held column by column in a CountryStore.
+
+    Precondition:
+        - All csv files have a column of either 'Country Name' or 'Country Code'
+        as well as a column of the input year
+    """
+    import numpy
+
+    names, codes, gdp, factor_columns, available = _country_columns([year])
 
-        clean_data_map[data_key] = each_data_map
+    for i in numpy.flatnonzero(~available[0]).tolist():
+        warnings.warn('Unavailable data for ' + names[i] + ' in ' + year, RuntimeWarning)
 
-    return clean_data_map
+    available_rows = numpy.flatnonzero(available[0]).tolist()
+    unique_codes, last_rows = _first_positions_last_rows([codes[i] for i in available_rows])
+    rows = numpy.array([available_rows[i] for i in last_rows], dtype=numpy.intp)
 
+    return CountryStore(unique_codes, [names[i] for i in rows.tolist()], gdp[0, rows],
+                        {name: factor_columns[name][0, rows] for name in factor_columns})
+
+
+@instrumented('get_clean_datasets')
+def get_clean_datasets(year: str) -> Dict[str, Dict[str, float]]:
+    """Provide a final revised dataset for performing computations"""
+    return _clean_datasets(map_iso_to_country(year))
 
+
+def _clean_datasets(mapped_iso_to_country: CountryStore) -> Dict[str, Dict[str, float]]:
+    """Provides the dataset given by get_clean_datasets from the countries of a year"""
+    return {data_key: dict(zip(mapped_iso_to_country.codes, mapped_iso_to_country.factors[data_key].tolist()))
+            for data_key in mapped_iso_to_country.factors}
+
+
+@instrumented('possible_years')
 def possible_years() -> List[str]:
     """Provides a list of years for which data can be analyzed
 
@@ -162,22 +797,127 @@ def possible_years() -> List[str]:
     current_year = today.year
     possible_year_list = []
 
-    for year in range(1950, current_year + 1):
+    tables = list(_responsibility_tables().values())
+    tables.append(_year_indexed_table(_gdp_path(), 'Country Code', 'Country Name'))
 
-        year_str = str(year)
-        try:
-            raw_datasets = get_clean_datasets(year_str)
-        except IndexError:
-            year += 1
-            continue
+    candidate_years = [str(year) for year in range(1950, current_year + 1)
+                       if all(str(year) in table.column_index for table in tables)]
 
-        is_invalid = False
-        if raw_datasets is not None:
-            for factor in raw_datasets:
-                is_invalid = all(raw_datasets[factor][code] == -999 for code in raw_datasets[factor])
-                if is_invalid:
-                    break
-            if not is_invalid:
-                possible_year_list.append(year_str)
+    if candidate_years:
+        available = _country_columns(candidate_years)[4]
+        possible_year_list = [year for year, is_valid in zip(candidate_years, available.any(axis=1)) if is_valid]
 
     return possible_year_list
+
+
+def _factor_statistics(clean_data: 'numpy.ndarray') -> FactorStatistics:
+    """Calculates the total of the clean data of a factor and the denominator
+    used when its relation is negative.
+    """
+    total_data = float(clean_data.sum())
+    sum_so_far = float((total_data - clean_data).sum())
+
+    return FactorStatistics(total_data, sum_so_far)
+
+
+@instrumented('build_year_dataset')
+def _build_year_dataset(year: str) -> YearDataset:
+    """Reads, cleans and freezes the datasets of the year"""
+    import numpy
+
+    mapped_iso_to_country = map_iso_to_country(year)
+    clean_data_map = _clean_datasets(mapped_iso_to_country)
+
+    clean = {factor: MappingProxyType(clean_data_map[factor]) for factor in clean_data_map}
+    factor_statistics = {factor: _factor_statistics(numpy.frombuffer(mapped_iso_to_country.factors[factor]))
+                         for factor in clean}
+
+    return YearDataset(year, mapped_iso_to_country, MappingProxyType(clean),
+                       MappingProxyType(factor_statistics))
+
+
+class YearDatasetCache:
+    """A bounded cache of the dataset of each year, discarding the least
+    recently used year once more than max_size years are held.
+
+    Every year is built at most once while it is held, even when asked for
+    from several threads at the same time. Years are built outside of the lock
+    of the cache, so building one year does not hold up threads asking for
+    others, while threads asking for the year being built wait for it.
+    """
+    max_size: int
+    _datasets: OrderedDict
+    _building: Dict[str, Future]
+    _lock: threading.Lock
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self._datasets = OrderedDict()
+        self._building = {}
+        self._lock = threading.Lock()
+
+    def get(self, year: str) -> YearDataset:
+        """Return the dataset of the year, building it if it is not held
+
+        Precondition:
+            - year is in possible_years()
+        """
+        with self._lock:
+            if year in self._datasets:
+                self._datasets.move_to_end(year)
+                return self._datasets[year]
+
+            build = self._building.get(year)
+            is_builder = build is None
+            if is_builder:
+                build = self._building[year] = Future()
+
+        if not is_builder:
+            return build.result()
+
+        try:
+            dataset = _build_year_dataset(year)
+        except BaseException as error:
+            with self._lock:
+                if self._building.get(year) is build:
+                    del self._building[year]
+            build.set_exception(error)
+            raise
+
+        with self._lock:
+            if self._building.get(year) is build:
+                del self._building[year]
+                self._datasets[year] = dataset
+                if len(self._datasets) > self.max_size:
+                    self._datasets.popitem(last=False)
+        build.set_result(dataset)
+
+        return dataset
+
+    def invalidate(self, year: Optional[str] = None) -> None:
+        """Discard the dataset of the year, or of every year along with the
+        tables read from the csv files if no year is given. Datasets being built
+        are still given to the threads waiting for them, but are not held.
+        """
+        global _COUNTRY_CODE_TABLE, _NAME_INDEX
+
+        with self._lock:
+            if year is None:
+                self._datasets.clear()
+                self._building.clear()
+                YEAR_INDEXED_TABLES.clear()
+                _COUNTRY_CODE_TABLE = None
+                _NAME_INDEX = None
+            else:
+                self._datasets.pop(year, None)
+                self._building.pop(year, None)
+
+
+YEAR_DATASETS = YearDatasetCache(16)
+
+
+def get_year_dataset(year: str) -> YearDataset:
+    """Provides the read only datasets of the year, building them only if they
+    are not already cached.
+    """
+    return YEAR_DATASETS.get(year)
@@ -0,0 +1,233 @@
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, Iterator, List, TypeVar, TYPE_CHECKING
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+if TYPE_CHECKING:
+    import cProfile
+
+# Environment variable enabling instrumentation, set to 1, true, yes or on, or naming the file the stage
+# statistics are written to at exit, as Prometheus text if it ends with .prom and as json otherwise
+INSTRUMENT_VARIABLE = 'CCLM_INSTRUMENT'
+
+# Environment variable naming a file to dump a cProfile of every thread of the run to, readable with pstats
+PROFILE_VARIABLE = 'CCLM_PROFILE'
+
+# Values of the environment variables that leave instrumentation or profiling off, or only turn it on
+OFF_VALUES = ('', '0', 'false', 'no', 'off')
+ON_VALUES = ('1', 'true', 'yes', 'on')
+
+
+def _setting(variable: str) -> str:
+    """Return the value of the environment variable, or '' if it turns its setting off"""
+    value = os.environ.get(variable, '').strip()
+    return '' if value.lower() in OFF_VALUES else value
+
+
+# Whether stages are being recorded. Recording a stage costs a single check of this flag while it is False
+ENABLED = bool(_setting(INSTRUMENT_VARIABLE))
+
+FunctionType = TypeVar('FunctionType', bound=Callable)
+
+
+@dataclass
+class StageStatistics:
+    """What a stage of the pipeline did while instrumentation was enabled. The
+    time of a stage includes the time of the stages it calls.
+
+    Instance Attributes:
+        - calls: the number of times the stage ran
+        - seconds: the wall time spent in the stage
+        - rows: the number of rows the stage parsed
+        - bytes_read: the number of bytes the stage read from disk
+    """
+    calls: int = 0
+    seconds: float = 0.0
+    rows: int = 0
+    bytes_read: int = 0
+
+
+STAGES: Dict[str, StageStatistics] = {}
+_STAGES_LOCK = threading.Lock()
+
+
+def record(stage_name: str, seconds: float = 0.0, calls: int = 1, rows: int = 0, bytes_read: int = 0) -> None:
+    """Adds to the statistics of the stage if instrumentation is enabled"""
+    if not ENABLED:
+        return
+
+    with _STAGES_LOCK:
+        statistics = STAGES.setdefault(stage_name, StageStatistics())
+        statistics.calls += calls
+        statistics.seconds += seconds
+        statistics.rows += rows
+        statistics.bytes_read += bytes_read
+
+
+def count(stage_name: str, rows: int = 0, bytes_read: int = 0) -> None:
+    """Adds rows parsed and bytes read to the statistics of the stage, without
+    counting a call of it.
+    """
+    record(stage_name, calls=0, rows=rows, bytes_read=bytes_read)
+
+
+def instrumented(stage_name: str) -> Callable[[FunctionType], FunctionType]:
+    """Decorates a function so that every call of it is recorded as a call of the
+    stage while instrumentation is enabled.
+    """
+    def decorate(function: FunctionType) -> FunctionType:
+        @functools.wraps(function)
+        def recorded(*args, **kwargs):
+            if not ENABLED:
+                return function(*args, **kwargs)
+
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                record(stage_name, time.perf_counter() - start)
+
+        return recorded
+
+    return decorate
+
+
+@contextmanager
+def stage(stage_name: str) -> Iterator[None]:
+    """Records the block of a with statement as a call of the stage while
+    instrumentation is enabled.
+    """
+    if not ENABLED:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage_name, time.perf_counter() - start)
+
+
+def enable(enabled: bool = True) -> None:
+    """Starts or stops recording stages"""
+    global ENABLED
+    ENABLED = enabled
+
+
+def reset() -> None:
+    """Forgets the statistics recorded so far"""
+    with _STAGES_LOCK:
+        STAGES.clear()
+
+
+def to_json() -> Dict[str, dict]:
+    """Provides the statistics of every stage recorded so far"""
+    with _STAGES_LOCK:
+        return {stage_name: asdict(STAGES[stage_name]) for stage_name in STAGES}
+
+
+def to_prometheus() -> str:
+    """Provides the statistics of every stage recorded so far in the Prometheus
+    text exposition format.
+    """
+    metrics = [('cclm_stage_calls_total', 'calls', 'Number of times each stage ran'),
+               ('cclm_stage_seconds_total', 'seconds', 'Wall time spent in each stage'),
+               ('cclm_stage_rows_total', 'rows', 'Rows parsed by each stage'),
+               ('cclm_stage_bytes_read_total', 'bytes_read', 'Bytes read from disk by each stage')]
+    statistics = to_json()
+    lines = []
+
+    for metric, field, description in metrics:
+        lines.append('# HELP ' + metric + ' ' + description)
+        lines.append('# TYPE ' + metric + ' counter')
+        for stage_name in statistics:
+            lines.append(metric + '{stage="' + stage_name.replace('"', '\\"') + '"} '
+                         + repr(statistics[stage_name][field]))
+
+    return '\n'.join(lines) + '\n'
+
+
+def write_report(file_name: str) -> None:
+    """Writes the statistics of every stage to the file, as Prometheus text if it
+    ends with .prom and as json otherwise.
+    """
+    with open(file_name, 'w') as report_file:
+        if file_name.endswith('.prom'):
+            report_file.write(to_prometheus())
+        else:
+            json.dump(to_json(), report_file, indent=1)
+
+
+# Profilers of the threads profiled so far, and the profiler of the current thread
+_PROFILERS: List['cProfile.Profile'] = []
+_THREAD_PROFILER = threading.local()
+_PROFILING = False
+
+
+def profile_current_thread() -> None:
+    """Profiles the rest of the current thread, once profiling was started from
+    PROFILE_VARIABLE. Threads started with the threading module are profiled from
+    their start, other threads, such as the ones of a QThreadPool, call this at
+    the start of their tasks.
+    """
+    if not _PROFILING or getattr(_THREAD_PROFILER, 'profiler', None) is not None:
+        return
+
+    import cProfile
+
+    profiler = cProfile.Profile()
+    _THREAD_PROFILER.profiler = profiler
+    with _STAGES_LOCK:
+        _PROFILERS.append(profiler)
+    profiler.enable()
+
+
+def _profile_new_thread(frame, event, arg) -> None:
+    """Profiles a thread started with the threading module from its first call"""
+    sys.setprofile(None)
+    profile_current_thread()
+
+
+def dump_profile(file_name: str) -> None:
+    """Writes the profile of every thread profiled so far to the file, readable with pstats"""
+    import pstats
+
+    with _STAGES_LOCK:
+        profilers = list(_PROFILERS)
+    if not profilers:
+        return
+
+    statistics = pstats.Stats(profilers[0])
+    for profiler in profilers[1:]:
+        statistics.add(profiler)
+    statistics.dump_stats(file_name)
+
+
+def _start_from_environment() -> None:
+    """Writes the stage statistics at exit if INSTRUMENT_VARIABLE names a file, and
+    starts profiling every thread of the run if PROFILE_VARIABLE names a file,
+    dumping the profile at exit.
+    """
+    global _PROFILING
+
+    report_file = _setting(INSTRUMENT_VARIABLE)
+    if report_file and report_file.lower() not in ON_VALUES:
+        atexit.register(write_report, report_file)
+
+    profile_file = _setting(PROFILE_VARIABLE)
+    if not profile_file:
+        return
+
+    _PROFILING = True
+    atexit.register(dump_profile, profile_file)
+    threading.setprofile(_profile_new_thread)
+    profile_current_thread()
+
+
+_start_from_environment()
@@ -0,0 +1,120 @@
+from Computation.computation import factor_scores
+from Computation.scenario_sweep import SweepResult, allocations, sweep
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, List, Optional, Tuple
+import numpy
+import os
+
+WORKER_COUNT = os.cpu_count() or 1
+
+# Arrays shared with the current worker process, attached once by _attach_arrays
+_WORKER_BLOCKS = []
+_WORKER_ARRAYS = {}
+
+
+def _share(array: numpy.ndarray, blocks: List[SharedMemory]) -> Tuple[str, tuple, str]:
+    """Copy the array into a new shared memory block, add the block to blocks and
+    return the description used by workers to attach to it.
+    """
+    block = SharedMemory(create=True, size=max(array.nbytes, 1))
+    blocks.append(block)
+    numpy.ndarray(array.shape, array.dtype, buffer=block.buf)[...] = array
+
+    return block.name, array.shape, array.dtype.str
+
+
+def _attach(description: Tuple[str, tuple, str], blocks: List[SharedMemory]) -> numpy.ndarray:
+    """Return the array in the shared memory block described, adding the block to blocks"""
+    name, shape, dtype = description
+    block = SharedMemory(name=name)
+    blocks.append(block)
+
+    return numpy.ndarray(shape, numpy.dtype(dtype), buffer=block.buf)
+
+
+def _read(description: Tuple[str, tuple, str], blocks: List[SharedMemory]) -> numpy.ndarray:
+    """Return a copy of the array in the shared memory block described, which must
+    be one of blocks.
+    """
+    name, shape, dtype = description
+    block = next(block for block in blocks if block.name == name)
+
+    return numpy.ndarray(shape, numpy.dtype(dtype), buffer=block.buf).copy()
+
+
+def _attach_arrays(descriptions: Dict[str, Tuple[str, tuple, str]]) -> None:
+    """Attach the worker process to every shared array, so that tasks only need
+    to be sent their positions.
+    """
+    for key in descriptions:
+        _WORKER_ARRAYS[key] = _attach(descriptions[key], _WORKER_BLOCKS)
+
+
+def _sweep_chunk(total_budget: float, year_index: int, start: int, stop: int) -> None:
+    """Calculates the allocations of scenarios start to stop of a year, writing them
+    into the shared result arrays.
+    """
+    budget, percentage = allocations(total_budget,
+                                     _WORKER_ARRAYS['direct ' + str(year_index)],
+                                     _WORKER_ARRAYS['inverse ' + str(year_index)],
+                                     _WORKER_ARRAYS['gdp ' + str(year_index)],
+                                     _WORKER_ARRAYS['weights'][start:stop],
+                                     _WORKER_ARRAYS['is_direct'][start:stop])
+
+    _WORKER_ARRAYS['budget ' + str(year_index)][start:stop] = budget
+    _WORKER_ARRAYS['percentage ' + str(year_index)][start:stop] = percentage
+
+
+def parallel_sweep(total_budget: float, years: List[str], factors: List[str], weights: numpy.ndarray,
+                   is_direct: numpy.ndarray, workers: Optional[int] = None) -> Dict[str, SweepResult]:
+    """Gives the same result as sweep, splitting the scenarios of every year among
+    a pool of worker processes.
+
+    The scores of each year, the scenarios and the results are held in shared
+    memory, so tasks send no arrays between processes. Uses WORKER_COUNT workers
+    if workers is not given, and runs sweep directly for a single worker.
+
+    Preconditions:
+        - the preconditions of sweep hold
+        - workers is None or workers >= 1
+    """
+    if workers is None:
+        workers = WORKER_COUNT
+    if workers == 1:
+        return sweep(total_budget, years, factors, weights, is_direct)
+
+    weights = numpy.asarray(weights, dtype=float)
+    is_direct = numpy.broadcast_to(numpy.asarray(is_direct, dtype=bool), weights.shape)
+    scenario_count = len(weights)
+    year_scores = [factor_scores(year, factors) for year in years]
+
+    blocks = []
+    try:
+        descriptions = {'weights': _share(weights, blocks), 'is_direct': _share(is_direct, blocks)}
+        for i, scores in enumerate(year_scores):
+            result_shape = (scenario_count, len(scores.codes))
+            descriptions['direct ' + str(i)] = _share(scores.direct, blocks)
+            descriptions['inverse ' + str(i)] = _share(scores.inverse, blocks)
+            descriptions['gdp ' + str(i)] = _share(scores.gdp, blocks)
+            descriptions['budget ' + str(i)] = _share(numpy.zeros(result_shape), blocks)
+            descriptions['percentage ' + str(i)] = _share(numpy.zeros(result_shape), blocks)
+
+        chunk_size = max(1, -(-scenario_count // (workers * 4)))
+        with ProcessPoolExecutor(workers, initializer=_attach_arrays, initargs=(descriptions,)) as executor:
+            tasks = [executor.submit(_sweep_chunk, total_budget, i, start, min(start + chunk_size, scenario_count))
+                     for i in range(len(years)) for start in range(0, scenario_count, chunk_size)]
+            for task in tasks:
+                task.result()
+
+        results = {}
+        for i, scores in enumerate(year_scores):
+            budget = _read(descriptions['budget ' + str(i)], blocks)
+            percentage = _read(descriptions['percentage ' + str(i)], blocks)
+            results[scores.year] = SweepResult(scores.year, scores.codes, scores.factors, budget, percentage)
+
+        return results
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
@@ -0,0 +1,171 @@
+from Computation.computation import allocate_budget
+from Computation.dataset_cache import CACHE_DIRECTORY
+from Computation.dataset_utilities import YEAR_DATASETS, dataset_version
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import warnings
+
+# Seconds during which the version of the raw datasets is assumed not to have changed since it was last read
+VERSION_CHECK_INTERVAL = 1.0
+
+# Directory of the on-disk store of allocations, used when it is enabled
+RESULTS_DIRECTORY = os.path.join(CACHE_DIRECTORY, 'Results')
+
+
+def scenario_fingerprint(total_budget: float, factor_proportionality: Dict[str, str], weights: Dict[str, float],
+                         year: str) -> str:
+    """Provides a hash of the scenario that does not depend on the order of its
+    factors, so that identical scenarios share it.
+    """
+    canonical = json.dumps({'year': str(year), 'budget': float(total_budget),
+                            'proportionality': factor_proportionality,
+                            'weights': {factor: float(weights[factor]) for factor in weights}},
+                           sort_keys=True, separators=(',', ':'))
+
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class ResultCache:
+    """A bounded cache of allocations keyed by scenario fingerprint, discarding the
+    least recently used allocation once more than max_size are held, and also
+    storing allocations as json files in directory unless it is None.
+
+    Every allocation is kept with the dataset_version it was computed from. Once
+    the raw datasets change, the allocations of earlier versions are discarded,
+    both in memory and on disk, along with the datasets of every year. Changes are
+    noticed within VERSION_CHECK_INTERVAL seconds.
+
+    Instance Attributes:
+        - max_size: the most allocations held in memory
+        - directory: the directory of the on-disk store, or None to only hold allocations in memory
+    """
+    max_size: int
+    directory: Optional[str]
+    _results: OrderedDict
+    _version: Optional[str]
+    _version_read_at: float
+    _lock: threading.Lock
+
+    def __init__(self, max_size: int, directory: Optional[str] = None) -> None:
+        self.max_size = max_size
+        self.directory = directory
+        self._results = OrderedDict()
+        self._version = None
+        self._version_read_at = float('-inf')
+        self._lock = threading.Lock()
+
+    def _path(self, version: str, fingerprint: str) -> str:
+        """Provides the path of the stored allocation of the scenario"""
+        return os.path.join(self.directory, version + '-' + fingerprint + '.json')
+
+    def _current_version(self) -> str:
+        """Provides the dataset_version, reading it again only once
+        VERSION_CHECK_INTERVAL has passed since it was last read.
+        """
+        now = time.monotonic()
+
+        if self._version is None or now - self._version_read_at >= VERSION_CHECK_INTERVAL:
+            self._check_version(dataset_version())
+            self._version_read_at = now
+
+        return self._version
+
+    def _check_version(self, version: str) -> None:
+        """Discards every allocation of another version once the version changes"""
+        if version == self._version:
+            return
+        elif self._version is not None:
+            YEAR_DATASETS.invalidate()
+
+        self._results.clear()
+        self._version = version
+
+        if self.directory is not None and os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                if name.endswith('.json') and not name.startswith(version + '-'):
+                    try:
+                        os.remove(os.path.join(self.directory, name))
+                    except OSError:
+                        pass
+
+    def _load(self, version: str, fingerprint: str) -> Optional[Dict[str, Tuple[float, float]]]:
+        """Provides the stored allocation of the scenario, or None if it is not stored"""
+        if self.directory is None:
+            return None
+
+        try:
+            with open(self._path(version, fingerprint)) as result_file:
+                stored = json.load(result_file)
+        except (OSError, ValueError):
+            return None
+
+        return {code: (stored[code][0], stored[code][1]) for code in stored}
+
+    def _store(self, version: str, fingerprint: str, allocation: Dict[str, Tuple[float, float]]) -> None:
+        """Writes the allocation of the scenario to the on-disk store, if it is enabled"""
+        if self.directory is None:
+            return
+
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            file_descriptor, temporary_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(file_descriptor, 'w') as temporary_file:
+                json.dump(allocation, temporary_file)
+            os.replace(temporary_path, self._path(version, fingerprint))
+        except OSError:
+            warnings.warn('Unable to store an allocation in ' + self.directory, RuntimeWarning)
+
+    def allocation(self, total_budget: float, factor_proportionality: Dict[str, str], weights: Dict[str, float],
+                   year: str) -> Dict[str, Tuple[float, float]]:
+        """Provides the result of allocate_budget for the scenario, computing it only
+        if it is neither held in memory nor stored on disk for the current version of
+        the raw datasets.
+
+        Preconditions:
+            - the preconditions of allocate_budget hold
+        """
+        fingerprint = scenario_fingerprint(total_budget, factor_proportionality, weights, year)
+
+        with self._lock:
+            version = self._current_version()
+            if fingerprint in self._results:
+                self._results.move_to_end(fingerprint)
+                return dict(self._results[fingerprint])
+
+        allocation = self._load(version, fingerprint)
+        if allocation is None:
+            allocation = allocate_budget(total_budget, factor_proportionality, weights, year)
+            self._store(version, fingerprint, allocation)
+
+        with self._lock:
+            if version == self._version:
+                self._results[fingerprint] = allocation
+                if len(self._results) > self.max_size:
+                    self._results.popitem(last=False)
+
+        return dict(allocation)
+
+    def clear(self) -> None:
+        """Discards every allocation held in memory or stored on disk"""
+        with self._lock:
+            self._results.clear()
+            self._version = None
+            if self.directory is not None and os.path.isdir(self.directory):
+                for name in os.listdir(self.directory):
+                    if name.endswith('.json'):
+                        os.remove(os.path.join(self.directory, name))
+
+
+ALLOCATIONS = ResultCache(256)
+
+
+def cached_allocation(total_budget: float, factor_proportionality: Dict[str, str], weights: Dict[str, float],
+                      year: str) -> Dict[str, Tuple[float, float]]:
+    """Provides the result of allocate_budget for the scenario from ALLOCATIONS"""
+    return ALLOCATIONS.allocation(total_budget, factor_proportionality, weights, year)
@@ -0,0 +1,102 @@
+from Computation.computation import FactorScores, factor_scores
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+import itertools
+import numpy
+
+
+@dataclass(frozen=True)
+class SweepResult:
+    """Class for maintaining the allocations of every scenario of a sweep in a year.
+    Rows of budget and percentage follow the scenarios and columns follow codes."""
+    year: str
+    codes: List[str]
+    factors: List[str]
+    budget: numpy.ndarray
+    percentage: numpy.ndarray
+
+
+def weight_grid(factor_count: int, steps: int) -> numpy.ndarray:
+    """Provides every weight vector of factor_count factors whose weights are
+    multiples of 1 / steps and add up to 1, one vector per row.
+
+    Preconditions:
+        - factor_count >= 1
+        - steps >= 1
+    """
+    vectors = [parts for parts in itertools.product(range(steps + 1), repeat=factor_count - 1)
+               if sum(parts) <= steps]
+    grid = numpy.array(vectors, dtype=float).reshape(len(vectors), factor_count - 1)
+    last = steps - grid.sum(axis=1, keepdims=True)
+
+    return numpy.hstack([grid, last]) / steps
+
+
+def random_weights(factor_count: int, scenario_count: int, seed: Optional[int] = None) -> numpy.ndarray:
+    """Provides scenario_count weight vectors drawn uniformly from all vectors of
+    factor_count non negative weights adding up to 1, one vector per row.
+    """
+    generator = numpy.random.default_rng(seed)
+    return generator.dirichlet(numpy.ones(factor_count), size=scenario_count)
+
+
+def proportionality_grid(factor_count: int) -> numpy.ndarray:
+    """Provides every assignment of direct (True) or inverse (False) relations to
+    factor_count factors, one assignment per row.
+    """
+    return numpy.array(list(itertools.product([True, False], repeat=factor_count)),
+                       dtype=bool).reshape(2 ** factor_count, factor_count)
+
+
+def scenario_product(weights: numpy.ndarray, is_direct: numpy.ndarray) -> Dict[str, numpy.ndarray]:
+    """Provides the scenarios pairing every weight vector with every proportionality
+    assignment, as the weights and is_direct arrays taken by sweep.
+    """
+    return {'weights': numpy.repeat(weights, len(is_direct), axis=0),
+            'is_direct': numpy.tile(is_direct, (len(weights), 1))}
+
+
+def allocations(total_budget: float, direct: numpy.ndarray, inverse: numpy.ndarray, gdp: numpy.ndarray,
+                weights: numpy.ndarray, is_direct: numpy.ndarray) -> Tuple[numpy.ndarray, numpy.ndarray]:
+    """Calculates the scenarios x countries budget and budget percentage arrays from the
+    direct and inverse scores and the gdp of a year, as given in FactorScores.
+    """
+    direct_weights = numpy.where(is_direct, weights, 0.0)
+    inverse_weights = weights - direct_weights
+
+    budget = (direct_weights @ direct.T + inverse_weights @ inverse.T) * total_budget
+    percentage = budget / gdp * 100
+
+    return budget, percentage
+
+
+def _sweep_year(total_budget: float, scores: FactorScores, weights: numpy.ndarray,
+                is_direct: numpy.ndarray) -> SweepResult:
+    """Calculates the allocations of every scenario from the scores of a year"""
+    budget, percentage = allocations(total_budget, scores.direct, scores.inverse, scores.gdp,
+                                     weights, is_direct)
+
+    return SweepResult(scores.year, scores.codes, scores.factors, budget, percentage)
+
+
+def sweep(total_budget: float, years: List[str], factors: List[str], weights: numpy.ndarray,
+          is_direct: numpy.ndarray) -> Dict[str, SweepResult]:
+    """Calculates the budget and the budget percentage of every country for every
+    scenario in each of the years. Row i of weights and is_direct gives the
+    weight and the relation (True for direct) of each factor in scenario i, with
+    columns following factors. A single row of is_direct is used for every scenario.
+
+    The scores of each year are prepared once and shared by every scenario, so the
+    allocations of a year take two matrix products.
+
+    Preconditions:
+        - weights.shape == (scenario count, len(factors))
+        - is_direct.shape in {(scenario count, len(factors)), (1, len(factors)), (len(factors),)}
+        - all rows of weights add up to 1
+        - total_budget >= 1,000,000
+    """
+    weights = numpy.asarray(weights, dtype=float)
+    is_direct = numpy.broadcast_to(numpy.asarray(is_direct, dtype=bool), weights.shape)
+
+    return {year: _sweep_year(total_budget, factor_scores(year, factors), weights, is_direct)
+            for year in years}
@@ -0,0 +1,169 @@
+from Computation.dataset_utilities import DatasetTable, _make_table, open_dataset, resolve_country_names
+from Computation.instrumentation import count, instrumented
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional
+import csv
+import itertools
+import numpy
+import os
+import time
+
+AGGREGATIONS = ('sum', 'mean', 'count')
+
+
+@dataclass
+class IngestionReport:
+    """Class for maintaining the progress of a streamed ingestion"""
+    file_name: str
+    rows: int = 0
+    unresolved_rows: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        """The rows read per second so far"""
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+
+class _Accumulator:
+    """Sums and counts of the valid values of each column for every iso code seen,
+    growing as new iso codes appear."""
+    codes: List[str]
+    sums: numpy.ndarray
+    counts: numpy.ndarray
+    _index_of_code: Dict[str, int]
+
+    def __init__(self, column_count: int) -> None:
+        self.codes = []
+        self.sums = numpy.zeros((column_count, 0))
+        self.counts = numpy.zeros((column_count, 0), dtype=numpy.int64)
+        self._index_of_code = {}
+
+    def add(self, keys: List[str], values: numpy.ndarray) -> None:
+        """Add the columns x rows values, whose rows have the iso codes keys"""
+        chunk_codes, inverse = numpy.unique(numpy.array(keys, dtype=str), return_inverse=True)
+        chunk_codes = chunk_codes.tolist()
+        new_codes = [code for code in chunk_codes if code not in self._index_of_code]
+
+        if new_codes:
+            for code in new_codes:
+                self._index_of_code[code] = len(self.codes)
+                self.codes.append(code)
+            padding = ((0, 0), (0, len(new_codes)))
+            self.sums = numpy.pad(self.sums, padding)
+            self.counts = numpy.pad(self.counts, padding)
+
+        targets = numpy.array([self._index_of_code[code] for code in chunk_codes], dtype=numpy.intp)
+        valid = ~numpy.isnan(values)
+
+        for j in range(len(values)):
+            self.sums[j, targets] += numpy.bincount(inverse, weights=numpy.where(valid[j], values[j], 0.0),
+                                                    minlength=len(chunk_codes))
+            self.counts[j, targets] += numpy.bincount(inverse, weights=valid[j],
+                                                      minlength=len(chunk_codes)).astype(numpy.int64)
+
+    def result(self, aggregation: str) -> numpy.ndarray:
+        """Return the columns x codes aggregate, NaN for codes without any valid value"""
+        if aggregation == 'count':
+            return self.counts.astype(float)
+
+        with numpy.errstate(invalid='ignore', divide='ignore'):
+            aggregate = self.sums if aggregation == 'sum' else self.sums / self.counts
+
+        return numpy.where(self.counts > 0, aggregate, numpy.nan)
+
+
+def _chunks(rows: Iterator[List[str]], chunk_rows: int) -> Iterator[List[List[str]]]:
+    """Yield lists of at most chunk_rows rows"""
+    while True:
+        chunk = list(itertools.islice(rows, chunk_rows))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _chunk_values(chunk: List[List[str]], positions: List[int]) -> numpy.ndarray:
+    """Return the columns x rows numbers of the chunk in the columns at positions,
+    NaN where a cell is missing or not a number.
+    """
+    values = numpy.full((len(positions), len(chunk)), numpy.nan)
+
+    for j, position in enumerate(positions):
+        strings = numpy.array([row[position] if position < len(row) else '' for row in chunk], dtype=str)
+        try:
+            values[j] = numpy.where(strings == '', 'nan', strings).astype(float)
+        except ValueError:
+            for i, cell in enumerate(strings.tolist()):
+                try:
+                    values[j, i] = float(cell)
+                except ValueError:
+                    pass
+
+    return values
+
+
+@instrumented('stream_aggregate')
+def stream_aggregate(file_name: str, value_columns: List[str], aggregation: str = 'sum',
+                     independent_column: str = 'Country Code', back_up_independent_column: str = 'Country Name',
+                     chunk_rows: int = 100000,
+                     progress: Optional[Callable[[IngestionReport], None]] = None) -> DatasetTable:
+    """Read the csv file, which may be compressed as open_dataset allows, chunk_rows
+    rows at a time and aggregate its value columns by iso code. Rows are keyed by
+    the independent column, or by the country name in the back up independent
+    column. Rows whose country cannot be resolved are skipped.
+
+    Only one chunk and one aggregate per iso code and value column are held in
+    memory at a time, so files of any number of rows can be ingested. progress is
+    called with the report after every chunk.
+
+    Preconditions:
+        - aggregation in AGGREGATIONS
+        - chunk_rows >= 1
+        - all value columns and one of the independent columns are in the csv header
+    """
+    report = IngestionReport(file_name)
+    start = time.perf_counter()
+
+    with open_dataset(file_name) as csvfile:
+        reader = csv.reader(csvfile)
+        header = next(reader)
+        positions = [header.index(column) for column in value_columns]
+        is_iso_present = independent_column in header
+        req_i = header.index(independent_column if is_iso_present else back_up_independent_column)
+        accumulator = _Accumulator(len(value_columns))
+
+        for chunk in _chunks(reader, chunk_rows):
+            if is_iso_present:
+                keys = [row[req_i] for row in chunk]
+            else:
+                keys = resolve_country_names([row[req_i] for row in chunk]).codes
+
+            report.rows += len(chunk)
+            resolved = [i for i, key in enumerate(keys) if key not in {'', 'Not Found'}]
+            if len(resolved) < len(chunk):
+                report.unresolved_rows += len(chunk) - len(resolved)
+                chunk = [chunk[i] for i in resolved]
+                keys = [keys[i] for i in resolved]
+
+            accumulator.add(keys, _chunk_values(chunk, positions))
+            count('stream_aggregate', rows=len(chunk))
+
+            report.seconds = time.perf_counter() - start
+            if progress is not None:
+                progress(report)
+
+    count('stream_aggregate', bytes_read=os.path.getsize(file_name))
+    return _make_table(accumulator.codes, list(value_columns), accumulator.result(aggregation), {})
+
+
+def write_table(table: DatasetTable, file_name: str, independent_column: str = 'Country Code') -> None:
+    """Write the table as a csv file keyed by iso code, which can be placed in the
+    Responsibility Datasets directory. Missing numbers are written as empty cells.
+    """
+    with open(file_name, 'w', newline='') as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow([independent_column] + table.columns)
+
+        for i, key in enumerate(table.keys):
+            writer.writerow([key] + ['' if not table.valid[j, i] else repr(float(table.values[j, i]))
+                                     for j in range(len(table.columns))])
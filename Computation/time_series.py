@@ -0,0 +1,146 @@
+from Computation.dataset_utilities import _country_columns, _first_positions_last_rows
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+import numpy
+
+
+@dataclass(frozen=True)
+class FactorCube:
+    """Class for maintaining the data of every factor for every country over a range
+    of years, loaded at once. A country is available in a year if it has gdp and
+    data for every responsibility dataset in that year, as in map_iso_to_country.
+
+    Instance Attributes:
+        - years: the years of the cube, in order
+        - codes: the iso code of every country available in at least one of the years
+        - names: the name of each country
+        - factors: the factors of the cube
+        - values: a years x countries x factors array of the data, NaN where it is missing
+        - gdp: a years x countries array of the gdp of each country
+        - available: a years x countries mask of the countries available in each year
+    """
+    years: List[str]
+    codes: List[str]
+    names: List[str]
+    factors: List[str]
+    values: numpy.ndarray
+    gdp: numpy.ndarray
+    available: numpy.ndarray
+
+
+@dataclass(frozen=True)
+class TimeSeriesAllocation:
+    """Class for maintaining the allocation of a budget in every year of a range and
+    over the range as a whole. Columns follow codes, and countries without the data
+    an allocation needs are NaN in it.
+
+    Instance Attributes:
+        - years: the years of the range, in order
+        - codes: the iso code of every country available in at least one of the years
+        - names: the name of each country
+        - yearly_budget: a years x countries array of the allocation of each year on its own
+        - yearly_percentage: the yearly budget of each country as a percentage of its gdp that year
+        - cumulative_budget: the allocation by responsibility accumulated over the range, among
+        the countries available in every year of it
+        - cumulative_percentage: the cumulative budget as a percentage of the gdp of the last year
+    """
+    years: List[str]
+    codes: List[str]
+    names: List[str]
+    yearly_budget: numpy.ndarray
+    yearly_percentage: numpy.ndarray
+    cumulative_budget: numpy.ndarray
+    cumulative_percentage: numpy.ndarray
+
+
+def factor_cube(years: List[str], factors: List[str]) -> FactorCube:
+    """Loads the data of the factors for every country in every year at once
+
+    Precondition:
+        - all(year in possible_years() for year in years)
+        - factors are responsibility datasets
+    """
+    names, codes, gdp, factor_columns, available = _country_columns(years)
+
+    unique_codes, last_rows = _first_positions_last_rows(codes)
+    rows = numpy.array(last_rows, dtype=numpy.intp)
+    available = available[:, rows]
+    kept = available.any(axis=0)
+    rows = rows[kept]
+
+    values = numpy.stack([factor_columns[factor][:, rows] for factor in factors], axis=2)
+
+    return FactorCube(list(years), [code for code, is_kept in zip(unique_codes, kept) if is_kept],
+                      [names[row] for row in rows.tolist()], list(factors), values, gdp[:, rows],
+                      available[:, kept])
+
+
+def _scores(values: numpy.ndarray, available: numpy.ndarray, is_direct: numpy.ndarray) -> numpy.ndarray:
+    """Calculates the score of every country for every factor in one or more
+    snapshots at once, as factor_scores does, counting only available countries.
+    values is a ... x countries x factors array and available a ... x countries mask.
+    """
+    kept = numpy.where(available[..., None], values, 0.0)
+    totals = kept.sum(axis=-2, keepdims=True)
+    remainders = numpy.where(available[..., None], totals - kept, 0.0)
+
+    with numpy.errstate(invalid='ignore', divide='ignore'):
+        direct = kept / totals
+        inverse = remainders / remainders.sum(axis=-2, keepdims=True)
+
+    return numpy.where(is_direct, direct, inverse)
+
+
+def decay_weights(years: List[str], decay: float) -> numpy.ndarray:
+    """Provides the weight of each year in the cumulative responsibility, which is
+    decay to the power of the number of years before the last year. A decay of 1
+    sums the years evenly.
+
+    Precondition:
+        - 0 < decay <= 1
+    """
+    ages = int(years[-1]) - numpy.array([int(year) for year in years], dtype=float)
+    return decay ** ages
+
+
+def _budgets(scores: numpy.ndarray, available: numpy.ndarray, gdp: numpy.ndarray, weight_vector: numpy.ndarray,
+             total_budget: float) -> Tuple[numpy.ndarray, numpy.ndarray]:
+    """Calculates the budget and budget percentage of every country from its scores,
+    NaN for countries that are not available.
+    """
+    budget = numpy.where(available, scores @ weight_vector * total_budget, numpy.nan)
+
+    with numpy.errstate(invalid='ignore', divide='ignore'):
+        return budget, budget / gdp * 100
+
+
+def allocate_time_series(total_budget: float, factor_proportionality: Dict[str, str], weights: Dict[str, float],
+                         years: List[str], decay: float = 1.0) -> TimeSeriesAllocation:
+    """Calculates the allocation of the budget in each of the years and the allocation
+    by responsibility accumulated over the years, in one pass over the factor cube.
+
+    Each yearly allocation is the one allocate_budget gives for that year. The
+    cumulative allocation scores countries by the decay weighted sum of each factor
+    over the years, among the countries available in every year, with the relation
+    and weight of each factor as given.
+
+    Preconditions:
+        - the preconditions of allocate_budget hold for every year
+        - 0 < decay <= 1
+    """
+    factors = list(factor_proportionality)
+    cube = factor_cube(years, factors)
+    is_direct = numpy.array([factor_proportionality[factor] == 'direct' for factor in factors])
+    weight_vector = numpy.array([weights[factor] for factor in factors], dtype=float)
+
+    yearly_budget, yearly_percentage = _budgets(_scores(cube.values, cube.available, is_direct),
+                                                cube.available, cube.gdp, weight_vector, total_budget)
+
+    always_available = cube.available.all(axis=0)
+    accumulated = numpy.einsum('y,ycf->cf', decay_weights(cube.years, decay),
+                               numpy.where(cube.available[..., None], cube.values, 0.0))
+    cumulative_budget, cumulative_percentage = _budgets(_scores(accumulated, always_available, is_direct),
+                                                        always_available, cube.gdp[-1], weight_vector, total_budget)
+
+    return TimeSeriesAllocation(cube.years, cube.codes, cube.names, yearly_budget, yearly_percentage,
+                                cumulative_budget, cumulative_percentage)
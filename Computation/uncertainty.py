@@ -0,0 +1,224 @@
+from Computation.computation import _factor_matrix, allocation_arrays, factor_scores
+from Computation.dataset_utilities import get_year_dataset
+from Computation.parallel_sweep import WORKER_COUNT, _WORKER_ARRAYS, _attach_arrays, _read, _share
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, List, Optional
+import numpy
+
+# Distributions the factor data and the weights can be perturbed by
+DISTRIBUTIONS = ('normal', 'lognormal', 'uniform')
+
+# Number of samples drawn and allocated together. Each batch has its own random stream, so results do not
+# depend on how batches are split among workers
+SAMPLE_BATCH_SIZE = 2000
+
+
+@dataclass(frozen=True)
+class Perturbation:
+    """Class for describing the uncertainty of a quantity, which is multiplied by a
+    random factor centred on 1 in every sample. lognormal factors have mean 1.
+    normal and uniform factors are clipped at 0 so that perturbed values keep their
+    sign, which raises their mean above 1 once the spread lets them fall below 0.
+
+    Instance Attributes:
+        - distribution: one of DISTRIBUTIONS
+        - spread: the standard deviation of a normal or lognormal factor, or the half
+        width of a uniform one, relative to the value perturbed
+    """
+    distribution: str = 'normal'
+    spread: float = 0.0
+
+
+@dataclass(frozen=True)
+class UncertaintyResult:
+    """Class for maintaining the spread of the allocation of a scenario over the
+    samples of a Monte Carlo run. Arrays follow codes.
+
+    Instance Attributes:
+        - year: the year of the scenario
+        - codes: the iso code of every country with data in the year
+        - samples: the number of samples drawn
+        - confidence: the probability covered by the confidence intervals
+        - budget: the budget of each country without perturbation
+        - percentage: the budget percentage of each country without perturbation
+        - mean_budget: the mean budget of each country over the samples
+        - budget_lower: the lower bound of the confidence interval of each budget
+        - budget_upper: the upper bound of the confidence interval of each budget
+        - percentage_lower: the lower bound of the confidence interval of each budget percentage
+        - percentage_upper: the upper bound of the confidence interval of each budget percentage
+    """
+    year: str
+    codes: List[str]
+    samples: int
+    confidence: float
+    budget: numpy.ndarray
+    percentage: numpy.ndarray
+    mean_budget: numpy.ndarray
+    budget_lower: numpy.ndarray
+    budget_upper: numpy.ndarray
+    percentage_lower: numpy.ndarray
+    percentage_upper: numpy.ndarray
+
+
+def _check_perturbation(perturbation: Perturbation) -> None:
+    """Raises ValueError if the perturbation does not describe a distribution that
+    can be drawn from.
+    """
+    if perturbation.distribution not in DISTRIBUTIONS:
+        raise ValueError('unknown distribution ' + str(perturbation.distribution) + ', expected one of '
+                         + ', '.join(DISTRIBUTIONS))
+    elif not numpy.isfinite(perturbation.spread) or perturbation.spread < 0:
+        raise ValueError('the spread of a perturbation must be finite and not negative')
+
+
+def _multipliers(generator: numpy.random.Generator, perturbation: Perturbation, shape: tuple) -> numpy.ndarray:
+    """Draws random factors as described by the perturbation"""
+    spread = perturbation.spread
+
+    if spread == 0:
+        return numpy.ones(shape)
+    elif perturbation.distribution == 'normal':
+        return numpy.maximum(1 + spread * generator.standard_normal(shape), 0.0)
+    elif perturbation.distribution == 'lognormal':
+        return numpy.exp(spread * generator.standard_normal(shape) - spread ** 2 / 2)
+    elif perturbation.distribution == 'uniform':
+        return numpy.maximum(generator.uniform(1 - spread, 1 + spread, shape), 0.0)
+    else:
+        raise ValueError('unknown distribution ' + perturbation.distribution)
+
+
+def _sample_budgets(seed: numpy.random.SeedSequence, sample_count: int, total_budget: float,
+                    matrix: numpy.ndarray, weight_vector: numpy.ndarray, is_direct: numpy.ndarray,
+                    factor_perturbations: List[Perturbation], weight_perturbation: Perturbation) -> numpy.ndarray:
+    """Draws sample_count perturbations of the countries x factors matrix and of the
+    weights at once and calculates the samples x countries budgets, scoring each
+    sample as factor_scores does.
+    """
+    generator = numpy.random.default_rng(seed)
+    country_count, factor_count = matrix.shape
+
+    values = numpy.empty((sample_count, country_count, factor_count))
+    for j, perturbation in enumerate(factor_perturbations):
+        values[:, :, j] = matrix[:, j] * _multipliers(generator, perturbation, (sample_count, country_count))
+
+    weights = weight_vector * _multipliers(generator, weight_perturbation, (sample_count, factor_count))
+    weight_totals = weights.sum(axis=1)
+    if weight_vector.sum() > 0:
+        # Clipped multipliers can zero every weight of a sample, which is drawn again
+        empty_rows = numpy.flatnonzero(weight_totals == 0)
+        while len(empty_rows) > 0:
+            weights[empty_rows] = weight_vector * _multipliers(generator, weight_perturbation,
+                                                               (len(empty_rows), factor_count))
+            weight_totals[empty_rows] = weights[empty_rows].sum(axis=1)
+            empty_rows = empty_rows[weight_totals[empty_rows] == 0]
+
+        weights *= (weight_vector.sum() / weight_totals)[:, None]
+
+    totals = values.sum(axis=1, keepdims=True)
+    remainders = totals - values
+    scores = numpy.where(is_direct, values / totals, remainders / remainders.sum(axis=1, keepdims=True))
+
+    return numpy.einsum('scf,sf->sc', scores, weights) * total_budget
+
+
+def _sample_batch(batch_seed: numpy.random.SeedSequence, total_budget: float, start: int, stop: int,
+                  factor_perturbations: List[Perturbation], weight_perturbation: Perturbation) -> None:
+    """Calculates the budgets of samples start to stop, writing them into the shared
+    result array.
+    """
+    _WORKER_ARRAYS['samples'][start:stop] = _sample_budgets(
+        batch_seed, stop - start, total_budget, _WORKER_ARRAYS['matrix'], _WORKER_ARRAYS['weights'],
+        _WORKER_ARRAYS['is_direct'], factor_perturbations, weight_perturbation)
+
+
+def sample_allocations(total_budget: float, factor_proportionality: Dict[str, str], weights: Dict[str, float],
+                       year: str, samples: int, factor_perturbations: Dict[str, Perturbation],
+                       weight_perturbation: Perturbation = Perturbation(), seed: Optional[int] = None,
+                       workers: Optional[int] = None) -> numpy.ndarray:
+    """Provides the samples x countries budgets of the scenario, with the data of
+    each factor and the weights perturbed as given, ordered as
+    factor_scores(year, factors).codes. Factors without a perturbation are not
+    perturbed, and perturbed weights are scaled back to their original sum, drawing
+    a sample's weights again if they are all clipped to 0.
+
+    Samples are drawn in batches of SAMPLE_BATCH_SIZE, split among a pool of
+    WORKER_COUNT worker processes if workers is not given. The factor data and the
+    budgets are held in shared memory, as in parallel_sweep. A given seed gives
+    the same samples whatever the number of workers.
+
+    Preconditions:
+        - the preconditions of allocate_budget hold
+        - samples >= 1
+        - workers is None or workers >= 1
+
+    Raises ValueError if a perturbation has an unknown distribution or a negative
+    or non-finite spread.
+    """
+    for perturbation in list(factor_perturbations.values()) + [weight_perturbation]:
+        _check_perturbation(perturbation)
+
+    if workers is None:
+        workers = WORKER_COUNT
+
+    factors = list(factor_proportionality)
+    countries = get_year_dataset(year).countries
+    matrix, _ = _factor_matrix(countries, factors)
+
+    weight_vector = numpy.array([weights[factor] for factor in factors], dtype=float)
+    is_direct = numpy.array([factor_proportionality[factor] == 'direct' for factor in factors])
+    perturbations = [factor_perturbations.get(factor, Perturbation()) for factor in factors]
+
+    starts = list(range(0, samples, SAMPLE_BATCH_SIZE))
+    batch_seeds = numpy.random.SeedSequence(seed).spawn(len(starts))
+
+    if workers == 1 or len(starts) == 1:
+        return numpy.concatenate([
+            _sample_budgets(batch_seed, min(start + SAMPLE_BATCH_SIZE, samples) - start, total_budget, matrix,
+                            weight_vector, is_direct, perturbations, weight_perturbation)
+            for batch_seed, start in zip(batch_seeds, starts)])
+
+    blocks: List[SharedMemory] = []
+    try:
+        descriptions = {'matrix': _share(matrix, blocks), 'weights': _share(weight_vector, blocks),
+                        'is_direct': _share(is_direct, blocks),
+                        'samples': _share(numpy.zeros((samples, len(countries))), blocks)}
+
+        with ProcessPoolExecutor(workers, initializer=_attach_arrays, initargs=(descriptions,)) as executor:
+            tasks = [executor.submit(_sample_batch, batch_seed, total_budget, start,
+                                     min(start + SAMPLE_BATCH_SIZE, samples), perturbations, weight_perturbation)
+                     for batch_seed, start in zip(batch_seeds, starts)]
+            for task in tasks:
+                task.result()
+
+        return _read(descriptions['samples'], blocks)
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+
+def monte_carlo(total_budget: float, factor_proportionality: Dict[str, str], weights: Dict[str, float],
+                year: str, samples: int, factor_perturbations: Dict[str, Perturbation],
+                weight_perturbation: Perturbation = Perturbation(), confidence: float = 0.95,
+                seed: Optional[int] = None, workers: Optional[int] = None) -> UncertaintyResult:
+    """Estimates the uncertainty of the allocation of the scenario by allocating
+    the budget in samples perturbations of the factor data and the weights, as in
+    sample_allocations, and gives the central confidence interval of the budget and
+    the budget percentage of every country.
+
+    Preconditions:
+        - the preconditions of sample_allocations hold
+        - 0 < confidence < 1
+    """
+    scores = factor_scores(year, list(factor_proportionality))
+    budget, percentage = allocation_arrays(scores, total_budget, factor_proportionality, weights)
+
+    budgets = sample_allocations(total_budget, factor_proportionality, weights, year, samples,
+                                 factor_perturbations, weight_perturbation, seed, workers)
+    tail = (1 - confidence) / 2
+    lower, upper = numpy.quantile(budgets, [tail, 1 - tail], axis=0)
+
+    return UncertaintyResult(year, scores.codes, samples, confidence, budget, percentage, budgets.mean(axis=0),
+                             lower, upper, lower / scores.gdp * 100, upper / scores.gdp * 100)
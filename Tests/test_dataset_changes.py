@@ -0,0 +1,86 @@
+"""Checks that results stay consistent with the datasets when the raw datasets
+change between two allocations of the same year.
+
+Run from the root directory of the project, for example:
+    python -m pytest -q Tests
+"""
+import os
+import shutil
+import tempfile
+import unittest
+import warnings
+
+from Computation import dataset_cache, dataset_utilities, result_cache
+
+YEAR = '2014'
+REMOVED_CODE = 'CAN'
+
+
+class DatasetChangeTest(unittest.TestCase):
+    """Allocates with a copy of the raw datasets, then removes a country from it"""
+
+    def setUp(self) -> None:
+        warnings.simplefilter('ignore', RuntimeWarning)
+        self.directory = tempfile.mkdtemp()
+        self.saved = (dataset_utilities.RAW_DATASETS_PATH, dataset_cache.CACHE_DIRECTORY,
+                      result_cache.VERSION_CHECK_INTERVAL)
+
+        raw_path = os.path.join(self.directory, 'Raw Datasets')
+        shutil.copytree(dataset_utilities.RAW_DATASETS_PATH, raw_path)
+        dataset_utilities.RAW_DATASETS_PATH = raw_path
+        dataset_cache.CACHE_DIRECTORY = os.path.join(self.directory, 'Compiled Datasets')
+        result_cache.VERSION_CHECK_INTERVAL = 0.0
+        result_cache.ALLOCATIONS.clear()
+        dataset_utilities.YEAR_DATASETS.invalidate()
+
+        factors = sorted(dataset_utilities.get_year_dataset(YEAR).clean)
+        self.proportionality = {factor: 'direct' for factor in factors}
+        self.weights = {factor: 1 / len(factors) for factor in factors}
+
+    def tearDown(self) -> None:
+        (dataset_utilities.RAW_DATASETS_PATH, dataset_cache.CACHE_DIRECTORY,
+         result_cache.VERSION_CHECK_INTERVAL) = self.saved
+        result_cache.ALLOCATIONS.clear()
+        dataset_utilities.YEAR_DATASETS.invalidate()
+        shutil.rmtree(self.directory)
+
+    def remove_country(self) -> None:
+        """Removes REMOVED_CODE from a responsibility dataset of the copy"""
+        path = dataset_utilities._responsibility_dataset_paths()['Renewable Energy']
+        with open(path, encoding='utf-8-sig') as dataset_file:
+            lines = dataset_file.readlines()
+        with open(path, 'w', encoding='utf-8') as dataset_file:
+            dataset_file.writelines(line for line in lines if '"' + REMOVED_CODE + '"' not in line)
+
+    def test_service_allocation_follows_new_datasets(self) -> None:
+        from service import AllocationService
+
+        service = AllocationService(preload=False)
+        scenario = {'year': YEAR, 'budget': 1e9, 'proportionality': self.proportionality,
+                    'weights': {factor: self.weights[factor] * 100 for factor in self.weights}}
+
+        self.assertIn(REMOVED_CODE, service._allocate(scenario)['allocation'])
+        self.remove_country()
+        allocation = service._allocate(scenario)['allocation']
+
+        countries = dataset_utilities.get_year_dataset(YEAR).countries
+        self.assertNotIn(REMOVED_CODE, allocation)
+        self.assertEqual(set(allocation), set(countries))
+        for code in allocation:
+            self.assertEqual(allocation[code]['name'], countries[code].name)
+
+    def test_map_columns_follow_new_datasets(self) -> None:
+        from Application.Functionalities.map import build_figure
+
+        result_cache.cached_allocation(1e9, self.proportionality, self.weights, YEAR)
+        self.remove_country()
+        trace = build_figure(1e9, self.proportionality, self.weights, YEAR).data[0]
+
+        countries = dataset_utilities.get_year_dataset(YEAR).countries
+        self.assertNotIn(REMOVED_CODE, trace.locations)
+        self.assertEqual(len(trace.locations), len(countries))
+        self.assertEqual(list(trace.hovertext), [countries[code].name for code in trace.locations])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,234 @@
+import argparse
+import csv
+import json
+import math
+import os
+import sys
+from typing import Dict, List, Optional
+
+from Computation.result_cache import ALLOCATIONS, RESULTS_DIRECTORY, cached_allocation
+from Computation.dataset_utilities import get_year_dataset, possible_years
+
+OUTPUT_COLUMNS = ['Scenario', 'Year', 'Iso Code', 'Country Name', 'Budget', 'Budget Percentage']
+
+
+def _parse_factor_values(pairs: List[str]) -> Dict[str, str]:
+    """Converts arguments of the form 'factor=value' to a mapping of factor to value
+
+    Precondition:
+        - all('=' in pair for pair in pairs)
+    """
+    values = {}
+
+    for pair in pairs:
+        factor, value = pair.rsplit('=', 1)
+        values[factor.strip()] = value.strip()
+
+    return values
+
+
+def parse_scenario(year: str, budget: str, weights: Dict[str, str], relations: Dict[str, str]) -> dict:
+    """Provides a scenario with the year, the budget, the weight of each factor as a
+    percentage and the relation of each factor, which is direct if not given.
+    Relations of factors without a weight are kept, for scenario_error to report.
+
+    Raises ValueError if the budget or a weight is not a number.
+    """
+    proportionality = {factor: relations.get(factor) or 'direct' for factor in weights}
+    proportionality.update((factor, relations[factor]) for factor in relations if factor not in weights)
+
+    return {'year': str(year), 'budget': float(budget),
+            'weights': {factor: float(weights[factor]) for factor in weights},
+            'proportionality': proportionality}
+
+
+def read_scenarios(file_name: str) -> List[dict]:
+    """Reads the scenarios of a json or csv scenario file.
+
+    A json file holds a list of objects with the keys 'year', 'budget', 'weights'
+    and optionally 'proportionality'. A csv file has the columns 'year' and
+    'budget', a column named after each factor holding its weight and optionally
+    a column '<factor> relation' holding its relation.
+
+    Precondition:
+        - file_name ends with .json or .csv
+    """
+    if file_name.endswith('.json'):
+        with open(file_name) as json_file:
+            return [parse_scenario(entry['year'], entry['budget'], entry['weights'], entry.get('proportionality', {}))
+                    for entry in json.load(json_file)]
+
+    scenarios = []
+    with open(file_name, newline='') as csv_file:
+        for row in csv.DictReader(csv_file):
+            weights = {column: row[column] for column in row
+                       if column not in {'year', 'budget'} and not column.endswith(' relation')}
+            relations = {column[:-len(' relation')]: row[column] for column in row if column.endswith(' relation')}
+            scenarios.append(parse_scenario(row['year'], row['budget'], weights, relations))
+
+    return scenarios
+
+
+def scenario_error(scenario: dict, years: List[str]) -> Optional[str]:
+    """Return why the scenario does not satisfy the preconditions of the computation,
+    or None if it does. Weights are percentages, as in the WeightageWindow.
+    """
+    year = scenario['year']
+    if year not in years:
+        return 'no data can be analyzed for ' + year
+
+    factors = set(get_year_dataset(year).clean)
+    weights = scenario['weights']
+
+    if set(weights) != factors:
+        return 'weights must be given for exactly ' + ', '.join(sorted(factors))
+    elif set(scenario['proportionality']) != set(weights):
+        return 'relations were given for factors without a weight: ' \
+            + ', '.join(sorted(set(scenario['proportionality']) - set(weights)))
+    elif any(relation not in {'direct', 'inverse'} for relation in scenario['proportionality'].values()):
+        return 'relations must be direct or inverse'
+    elif not math.isfinite(scenario['budget']) or scenario['budget'] < 1000000:
+        return 'the budget must be a finite number of at least 1000000'
+    elif not all(math.isfinite(weights[factor]) for factor in weights):
+        return 'weights must be finite numbers'
+    elif any(weights[factor] < 0 for factor in weights) or sum(weights.values()) != 100:
+        return 'weights must not be negative and must add up to 100'
+    else:
+        return None
+
+
+def allocate_scenarios(scenarios: List[dict]) -> List[dict]:
+    """Provides a row of OUTPUT_COLUMNS for every country in every scenario"""
+    rows = []
+
+    for i, scenario in enumerate(scenarios):
+        year = scenario['year']
+        weights = {factor: scenario['weights'][factor] / 100 for factor in scenario['weights']}
+        output = cached_allocation(scenario['budget'], scenario['proportionality'], weights, year)
+        countries = get_year_dataset(year).countries
+
+        for code in output:
+            rows.append(dict(zip(OUTPUT_COLUMNS, [i, year, code, countries[code].name,
+                                                  output[code][0], output[code][1]])))
+
+    return rows
+
+
+def write_rows(rows: List[dict], file_name: str) -> None:
+    """Writes the rows to a csv, json or parquet file, chosen by the extension of
+    file_name. pandas is only imported to write parquet files.
+    """
+    if file_name.endswith('.json'):
+        with open(file_name, 'w') as json_file:
+            json.dump(rows, json_file, indent=1)
+    elif file_name.endswith('.parquet'):
+        import pandas
+        pandas.DataFrame(rows, columns=OUTPUT_COLUMNS).to_parquet(file_name, index=False)
+    else:
+        with open(file_name, 'w', newline='') as csv_file:
+            writer = csv.DictWriter(csv_file, OUTPUT_COLUMNS)
+            writer.writeheader()
+            writer.writerows(rows)
+
+
+def _named_scenarios(scenarios: List[dict]) -> Dict[str, tuple]:
+    """Provides the total budget, proportionality, weights as fractions and year of
+    each scenario, named scenario-<i>.
+    """
+    named = {}
+    for i, scenario in enumerate(scenarios):
+        weights = {factor: scenario['weights'][factor] / 100 for factor in scenario['weights']}
+        named['scenario-' + str(i)] = (scenario['budget'], scenario['proportionality'], weights, scenario['year'])
+
+    return named
+
+
+def write_parquet_dataset(scenarios: List[dict], directory: str) -> None:
+    """Writes the allocation of every scenario to <directory>/allocations and the
+    cleaned dataset of every year of the scenarios to <directory>/datasets, as
+    parquet partitioned by year and scenario. pyarrow is only imported to write them.
+    """
+    from Computation.arrow_export import write_allocations, write_year_datasets
+
+    write_allocations(_named_scenarios(scenarios), os.path.join(directory, 'allocations'))
+    write_year_datasets(sorted({scenario['year'] for scenario in scenarios}), os.path.join(directory, 'datasets'))
+
+
+def write_maps(scenarios: List[dict], directory: str, file_format: str) -> List[str]:
+    """Writes the map of every scenario to scenario-<i>.html or scenario-<i>.json in
+    the directory. plotly is only imported to write maps.
+    """
+    from Application.Functionalities.map import export_maps
+
+    return export_maps(_named_scenarios(scenarios), directory, file_format)
+
+
+def main(arguments: Optional[List[str]] = None) -> None:
+    """Headless entry point of CLIMATE-CHANGE-LIABILITY-METRIC, allocating the budget
+    of one scenario given as arguments or of every scenario in a scenario file,
+    without starting the application.
+    """
+    parser = argparse.ArgumentParser(description='Allocate a climate change budget among countries.')
+    parser.add_argument('--scenarios', help='json or csv file of scenarios to allocate')
+    parser.add_argument('--year', help='year to analyze')
+    parser.add_argument('--budget', help='total budget, at least 1000000')
+    parser.add_argument('--weight', action='append', default=[], metavar='FACTOR=PERCENT',
+                        help='weight of a factor as a percentage; give once per factor')
+    parser.add_argument('--relation', action='append', default=[], metavar='FACTOR=RELATION',
+                        help='direct (default) or inverse relation of a factor')
+    parser.add_argument('--output', default='-',
+                        help='.csv, .json or .parquet file to write, or - for csv on stdout')
+    parser.add_argument('--maps', metavar='DIRECTORY', help='also write the map of every scenario to DIRECTORY')
+    parser.add_argument('--map-format', choices=['html', 'json'], default='html',
+                        help='self-contained html pages (default) or plotly json figures')
+    parser.add_argument('--parquet-dataset', metavar='DIRECTORY',
+                        help='also write the allocations to DIRECTORY as parquet partitioned by year and scenario, '
+                             'along with the cleaned dataset of each year')
+    parser.add_argument('--cache-results', action='store_true',
+                        help='keep allocations on disk so that later runs of the same scenarios reuse them')
+    parser.add_argument('--list-years', action='store_true', help='print the years that can be analyzed')
+    args = parser.parse_args(arguments)
+
+    years = possible_years()
+    if args.list_years:
+        print('\n'.join(years))
+        return
+
+    try:
+        if args.scenarios is not None:
+            scenarios = read_scenarios(args.scenarios)
+        elif args.year is not None and args.budget is not None and args.weight:
+            scenarios = [parse_scenario(args.year, args.budget, _parse_factor_values(args.weight),
+                                        _parse_factor_values(args.relation))]
+        else:
+            parser.error('either --scenarios or --year, --budget and --weight are required')
+    except (ValueError, KeyError, OSError) as error:
+        parser.error('invalid scenario: ' + str(error))
+
+    for i, scenario in enumerate(scenarios):
+        error = scenario_error(scenario, years)
+        if error is not None:
+            parser.error('scenario ' + str(i) + ': ' + error)
+
+    if args.cache_results:
+        ALLOCATIONS.directory = RESULTS_DIRECTORY
+
+    rows = allocate_scenarios(scenarios)
+
+    if args.parquet_dataset is not None:
+        write_parquet_dataset(scenarios, args.parquet_dataset)
+
+    if args.maps is not None:
+        write_maps(scenarios, args.maps, args.map_format)
+
+    if args.output == '-':
+        writer = csv.DictWriter(sys.stdout, OUTPUT_COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+    else:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        write_rows(rows, args.output)
+
+
+if __name__ == '__main__':
+    main()
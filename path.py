@@ -1,18 +1,15 @@
 import os
 
 
-def _global_project_path(current_path: str) -> str:
+def _global_project_path() -> str:
     """Gives path of the root directory of project, irrespective
-    of location from which the function is called.
+    of location from which the function is called or of the name
+    of the root directory.
 
     Preconditions:
-        - Project file structure has not been tampered with
+        - This file is in the root directory of the project
     """
-    if os.path.split(current_path)[1] == 'CLIMATE-CHANGE-LIABILITY-METRIC':
-        return current_path
-    else:
-        new_path = os.path.split(current_path)[0]
-        return _global_project_path(new_path)
+    return os.path.dirname(os.path.abspath(__file__))
 
 
-GLOBAL_PROJECT_PATH = _global_project_path(os.getcwd())
+GLOBAL_PROJECT_PATH = _global_project_path()
@@ -0,0 +1,246 @@
+import argparse
+import asyncio
+import bisect
+import json
+import time
+from typing import Dict, List, Optional, Tuple
+
+from batch import parse_scenario, scenario_error
+from Computation.result_cache import cached_allocation
+from Computation.dataset_utilities import get_year_dataset, possible_years
+
+# Upper bounds, in milliseconds, of the buckets of the latency histograms
+LATENCY_BUCKETS = [1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500]
+
+# Largest request body accepted, in bytes
+MAX_BODY_SIZE = 1 << 20
+
+# Routes answered by the service, other routes are recorded together as 'other'
+ROUTES = ('/years', '/allocate', '/metrics')
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+
+class LatencyHistogram:
+    """A cumulative histogram of the time taken to answer the requests of a route.
+
+    Instance Attributes:
+        - counts: the number of requests answered within each bucket of LATENCY_BUCKETS,
+        followed by the number answered more slowly
+        - total: the number of requests answered
+        - total_milliseconds: the time taken to answer all of them
+    """
+    counts: List[int]
+    total: int
+    total_milliseconds: float
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total = 0
+        self.total_milliseconds = 0.0
+
+    def record(self, milliseconds: float) -> None:
+        """Counts a request answered in the given time"""
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, milliseconds)] += 1
+        self.total += 1
+        self.total_milliseconds += milliseconds
+
+    def to_json(self) -> dict:
+        """Provides the histogram with cumulative bucket counts, as Prometheus reports them"""
+        buckets = {}
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS + ['+Inf'], self.counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+
+        return {'buckets_ms': buckets, 'count': self.total, 'sum_ms': self.total_milliseconds}
+
+
+class AllocationService:
+    """An HTTP/JSON service answering allocations from datasets kept in memory.
+
+    GET /years lists the years that can be analyzed. POST /allocate takes a scenario
+    as read by batch.py, with a year, a budget, the weight of each factor as a
+    percentage and optionally the relation of each factor, and answers the budget
+    and budget percentage of every country. GET /metrics gives a latency histogram
+    of every route.
+
+    Identical scenarios requested while one is being computed share its result, and
+    allocations are kept in the result cache for later requests.
+
+    Instance Attributes:
+        - years: the years that can be analyzed
+        - histograms: the latency histogram of each route
+    """
+    years: List[str]
+    histograms: Dict[str, LatencyHistogram]
+    _in_flight: Dict[str, asyncio.Future]
+
+    def __init__(self, preload: bool = True) -> None:
+        self.years = possible_years()
+        self.histograms = {}
+        self._in_flight = {}
+
+        if preload:
+            for year in self.years:
+                get_year_dataset(year)
+
+    def _allocate(self, scenario: dict) -> dict:
+        """Computes the allocation of a valid scenario, or takes it from the result
+        cache if the same scenario was allocated before.
+        """
+        year = scenario['year']
+        weights = {factor: scenario['weights'][factor] / 100 for factor in scenario['weights']}
+        allocation = cached_allocation(scenario['budget'], scenario['proportionality'], weights, year)
+        # Read after the allocation, which discards the datasets once they change, so that both agree
+        countries = get_year_dataset(year).countries
+
+        return {'year': year, 'budget': scenario['budget'],
+                'allocation': {code: {'name': countries[code].name, 'budget': allocation[code][0],
+                                      'percentage': allocation[code][1]}
+                               for code in allocation}}
+
+    async def allocate(self, scenario: dict) -> dict:
+        """Computes the allocation of a valid scenario off the event loop, sharing
+        the computation of an identical scenario already in flight.
+        """
+        key = json.dumps(scenario, sort_keys=True)
+
+        if key in self._in_flight:
+            return await asyncio.shield(self._in_flight[key])
+
+        future = asyncio.get_running_loop().run_in_executor(None, self._allocate, scenario)
+        self._in_flight[key] = future
+        try:
+            return await future
+        finally:
+            del self._in_flight[key]
+
+    async def respond(self, method: str, route: str, body: bytes) -> Tuple[int, dict]:
+        """Provides the status and json answer of a request"""
+        if route not in ROUTES:
+            return 404, {'error': 'unknown route ' + route}
+        elif (method, route) == ('GET', '/years'):
+            return 200, {'years': self.years}
+        elif (method, route) == ('GET', '/metrics'):
+            return 200, {path: self.histograms[path].to_json() for path in self.histograms}
+        elif (method, route) != ('POST', '/allocate'):
+            return 405, {'error': method + ' is not allowed on ' + route}
+
+        try:
+            entry = json.loads(body)
+            scenario = parse_scenario(entry['year'], entry['budget'], entry['weights'],
+                                      entry.get('proportionality', {}))
+        except (ValueError, KeyError, TypeError, AttributeError) as error:
+            return 400, {'error': 'invalid scenario: ' + str(error)}
+
+        # Validating a scenario builds the dataset of its year if it is not held yet, so it is done off the event loop
+        error = await asyncio.get_running_loop().run_in_executor(None, scenario_error, scenario, self.years)
+        if error is not None:
+            return 400, {'error': error}
+
+        return 200, await self.allocate(scenario)
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Answers the requests of a connection until the client closes it"""
+        try:
+            while True:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+
+                start = time.perf_counter()
+                method, route, body, keep_alive = request
+                if body is None:
+                    status, answer = 413, {'error': 'the request body is too large'}
+                    keep_alive = False
+                else:
+                    try:
+                        status, answer = await self.respond(method, route, body)
+                    except Exception as error:
+                        status, answer = 500, {'error': str(error)}
+
+                try:
+                    body = json.dumps(answer, allow_nan=False).encode()
+                except ValueError:
+                    status = 400
+                    body = json.dumps({'error': 'the scenario has no finite allocation'}).encode()
+
+                _write_response(writer, status, body, keep_alive)
+                await writer.drain()
+
+                milliseconds = (time.perf_counter() - start) * 1000
+                self.histograms.setdefault(route if route in ROUTES else 'other',
+                                           LatencyHistogram()).record(milliseconds)
+
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str, port: int) -> None:
+        """Serves requests on the host and port until cancelled"""
+        server = await asyncio.start_server(self.handle, host, port)
+        async with server:
+            await server.serve_forever()
+
+
+async def _read_request(reader: asyncio.StreamReader) -> Optional[Tuple[str, str, Optional[bytes], bool]]:
+    """Reads the method, route, body and whether to keep the connection alive of the
+    next HTTP/1.1 request of the connection, or None if the client closed it. The
+    body is None if it is larger than MAX_BODY_SIZE, in which case it is not read.
+    """
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+
+    method, target, version = request_line.decode('latin-1').split()
+    headers = {}
+    while True:
+        line = (await reader.readline()).decode('latin-1').strip()
+        if not line:
+            break
+        name, value = line.split(':', 1)
+        headers[name.strip().lower()] = value.strip()
+
+    length = int(headers.get('content-length', 0))
+    body = await reader.readexactly(length) if length <= MAX_BODY_SIZE else None
+    connection = headers.get('connection', '').lower()
+    keep_alive = connection == 'keep-alive' or (version == 'HTTP/1.1' and connection != 'close')
+
+    return method, target.split('?', 1)[0], body, keep_alive
+
+
+def _write_response(writer: asyncio.StreamWriter, status: int, body: bytes, keep_alive: bool) -> None:
+    """Writes a response with the encoded json body to the connection"""
+    head = ['HTTP/1.1 ' + str(status) + ' ' + REASONS[status],
+            'Content-Type: application/json',
+            'Content-Length: ' + str(len(body)),
+            'Connection: ' + ('keep-alive' if keep_alive else 'close')]
+
+    writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + body)
+
+
+def main(arguments: Optional[List[str]] = None) -> None:
+    """Entry point of the allocation service of CLIMATE-CHANGE-LIABILITY-METRIC"""
+    parser = argparse.ArgumentParser(description='Serve climate change budget allocations over HTTP.')
+    parser.add_argument('--host', default='127.0.0.1', help='address to listen on')
+    parser.add_argument('--port', type=int, default=8000, help='port to listen on')
+    parser.add_argument('--lazy', action='store_true',
+                        help='load the datasets of a year on its first request instead of at start up')
+    args = parser.parse_args(arguments)
+
+    service = AllocationService(preload=not args.lazy)
+    print('Serving allocations for ' + ', '.join(service.years) + ' on http://' + args.host + ':' + str(args.port))
+
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()